@@ -1,38 +1,148 @@
-import smtplib, imaplib, email, time
+import smtplib, imaplib, email, re, time, threading
 from datetime import datetime
+from email.header import decode_header, make_header
+from email.utils import parseaddr
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
 
+class SMTPConnectionPool:
+    """Keep a fixed number of authenticated SMTP sessions alive and reuse them across sends"""
+    def __init__(self, email_addr, password, smtp_server='smtp.gmail.com', port=587, size=4, timeout=30,
+                 acquire_timeout=120):
+        self.email = email_addr
+        self.password = password
+        self.smtp_server = smtp_server
+        self.port = port
+        self.size = size
+        self.timeout = timeout
+        self.acquire_timeout = acquire_timeout
+        self._idle = []
+        # Guards _idle and _opened; waiters are woken whenever a session or a slot is freed
+        self._cond = threading.Condition()
+        self._opened = 0
+
+    def _open(self):
+        """Open one STARTTLS session and log in"""
+        smtp = smtplib.SMTP(self.smtp_server, self.port, timeout=self.timeout)
+        smtp.starttls()
+        smtp.login(self.email, self.password)
+        return smtp
+
+    def _free_slot(self):
+        with self._cond:
+            self._opened -= 1
+            self._cond.notify()
+
+    def _discard(self, smtp):
+        """Drop a session that is no longer usable and free its slot"""
+        try:
+            smtp.close()
+        except Exception:
+            pass
+        self._free_slot()
+
+    def _open_slot(self):
+        """Open a session in a slot already reserved by the caller"""
+        try:
+            return self._open()
+        except BaseException:
+            self._free_slot()
+            raise
+
+    def acquire(self):
+        """Take an idle session, opening a new one while below the pool size"""
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while not self._idle and self._opened >= self.size:
+                # Every slot is busy, wait for a session or a slot to be handed back
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No SMTP session became free within {self.acquire_timeout}s")
+                self._cond.wait(remaining)
+            if self._idle:
+                return self._idle.pop()
+            self._opened += 1
+        return self._open_slot()
+
+    def release(self, smtp):
+        """Return a session to the pool for the next sender"""
+        with self._cond:
+            self._idle.append(smtp)
+            self._cond.notify()
+
+    def send_message(self, msg):
+        """Send a message on a pooled session, reconnecting once if the server dropped it"""
+        smtp = self.acquire()
+        try:
+            smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # Idle sessions get closed by the provider, retry once on a fresh login in the same slot
+            try:
+                smtp.close()
+            except Exception:
+                pass
+            smtp = self._open_slot()
+            try:
+                smtp.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                self._discard(smtp)
+                raise
+            except BaseException:
+                self.release(smtp)
+                raise
+        except BaseException:
+            self.release(smtp)
+            raise
+        self.release(smtp)
+
+    def warm_up(self):
+        """Open and log in every session up front"""
+        sessions = [self.acquire() for _ in range(self.size)]
+        for smtp in sessions:
+            self.release(smtp)
+
+    def close(self):
+        """Quit every idle session"""
+        with self._cond:
+            sessions, self._idle = self._idle, []
+        for smtp in sessions:
+            try:
+                smtp.quit()
+            except Exception:
+                pass
+            self._free_slot()
+
 class EmailAutoReply:
-    def __init__(self, email_addr, password, smtp_server='smtp.gmail.com', imap_server='imap.gmail.com'):
+    def __init__(self, email_addr, password, smtp_server='smtp.gmail.com', imap_server='imap.gmail.com', pool_size=4):
         self.email = email_addr
         self.password = password
         self.smtp_server = smtp_server
         self.imap_server = imap_server
-        self.smtp = None
+        self.pool = SMTPConnectionPool(email_addr, password, smtp_server, size=pool_size)
         self.imap = None
     
     def connect(self):
         """Establish SMTP and IMAP connections"""
-        self.smtp = smtplib.SMTP(self.smtp_server, 587)
-        self.smtp.starttls()
-        self.smtp.login(self.email, self.password)
-        
+        self.pool.warm_up()
+        self.connect_imap()
+    
+    def connect_imap(self):
+        """Establish the IMAP connection used for reading replies"""
         self.imap = imaplib.IMAP4_SSL(self.imap_server)
         self.imap.login(self.email, self.password)
     
     def disconnect(self):
         """Close connections"""
-        if self.smtp: self.smtp.quit()
+        self.pool.close()
         if self.imap: self.imap.close(), self.imap.logout()
     
     def send_email(self, recipient, subject, body):
-        """Send email to recipient"""
+        """Send email to recipient over a pooled SMTP session"""
         msg = MIMEMultipart()
         msg['From'], msg['To'], msg['Subject'] = self.email, recipient, subject
         msg.attach(MIMEText(body, 'plain'))
-        self.smtp.send_message(msg)
+        self.pool.send_message(msg)
         print(f"Email sent: {subject}")
     
     def extract_text(self, msg):
@@ -44,21 +154,75 @@ class EmailAutoReply:
         else:
             return msg.get_payload(decode=True).decode('utf-8').strip() if msg.get_payload() else ""
     
+    # Just the headers needed to decide whether a message is a reply worth reading
+    REPLY_HEADERS = 'BODY.PEEK[HEADER.FIELDS (FROM SUBJECT IN-REPLY-TO)]'
+    
+    def select_mailbox(self, mailbox='INBOX'):
+        """
+        Open a mailbox read-only (so nothing gets marked seen) and return its
+        (UIDVALIDITY, UIDNEXT); UIDNEXT is 0 if the server will not say
+        """
+        if self.imap is None:
+            self.connect_imap()
+        self.imap.select(mailbox, readonly=True)
+        _, validity = self.imap.response('UIDVALIDITY')
+        _, uid_next = self.imap.response('UIDNEXT')
+        if not uid_next or not uid_next[0]:
+            # Not every server sends UIDNEXT with SELECT, STATUS always can
+            _, status = self.imap.status(mailbox, '(UIDNEXT)')
+            match = re.search(rb'UIDNEXT (\d+)', status[0] or b'') if status else None
+            uid_next = [match.group(1)] if match else None
+        return (int(validity[0]) if validity and validity[0] else 0,
+                int(uid_next[0]) if uid_next and uid_next[0] else 0)
+    
+    def _uid_fetch(self, uids, items):
+        """UID FETCH, yielding (uid, literal) for each message in the response"""
+        _, data = self.imap.uid('fetch', uids, f'(UID {items})')
+        for part in data or []:
+            if isinstance(part, tuple):
+                match = re.search(rb'UID (\d+)', part[0])
+                if match:
+                    yield int(match.group(1)), part[1]
+    
+    def fetch_reply_headers(self, uids):
+        """
+        From, Subject and In-Reply-To for a UID set such as "101:*" or "5,9,12", without
+        downloading bodies. Returns a list of dicts sorted by UID.
+        """
+        headers = []
+        for uid, raw in self._uid_fetch(uids, self.REPLY_HEADERS):
+            msg = email.message_from_bytes(raw)
+            headers.append({
+                'uid': uid,
+                'from': parseaddr(str(make_header(decode_header(msg.get('From', '')))))[1].lower(),
+                'subject': str(make_header(decode_header(msg.get('Subject', '')))),
+                'in_reply_to': msg.get('In-Reply-To', '').strip(),
+            })
+        return sorted(headers, key=lambda header: header['uid'])
+    
+    def fetch_reply_bodies(self, uids):
+        """Plain text bodies for the given UIDs, keyed by UID"""
+        if not uids:
+            return {}
+        uid_set = ','.join(str(uid) for uid in uids)
+        return {uid: self.extract_text(email.message_from_bytes(raw))
+                for uid, raw in self._uid_fetch(uid_set, 'BODY.PEEK[]')}
+    
     def check_reply(self, sender_email, subject_keywords, since_time):
         """Check for replies from sender containing subject keywords"""
-        self.imap.select('INBOX')
+        self.select_mailbox('INBOX')
         search_criteria = f'(FROM "{sender_email}" SINCE "{since_time.strftime("%d-%b-%Y")}")'
-        _, messages = self.imap.search(None, search_criteria)
+        _, messages = self.imap.uid('search', None, search_criteria)
         
-        for num in messages[0].split()[-10:]:
-            _, msg_data = self.imap.fetch(num, '(RFC822)')
-            msg = email.message_from_bytes(msg_data[0][1])
-            if any(keyword.lower() in msg.get('Subject', '').lower() for keyword in subject_keywords):
-                return self.extract_text(msg)
+        uids = messages[0].split()[-10:]
+        if not uids:
+            return None
+        for header in self.fetch_reply_headers(b','.join(uids).decode()):
+            if any(keyword.lower() in header['subject'].lower() for keyword in subject_keywords):
+                return self.fetch_reply_bodies([header['uid']]).get(header['uid'])
         return None
     
     def send_with_followup(self, recipient, subject, message, follow_up_message, wait_seconds=30):
-        self.connect()
         self.send_email(recipient,subject,message)
 
         return 
@@ -1,15 +1,14 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import re
-import time
 import sqlite3
 from db import CompanyDatabase  
-from gemini import gemini_class  
 from Email import EmailAutoReply
-import base64
-import json
-from urllib.parse import urlencode
+from dispatcher import EmailDispatcher, parse_provider_rates
+from delivery_worker import DeliveryWorker
+from jobs import JobRunner
+from rollout import PolicyRollout
+from tokens import require_secret
 from dotenv import load_dotenv
 import os
 load_dotenv()
@@ -28,16 +27,34 @@ st.set_page_config(
 def get_database():
     """Initialize and return database instance"""
     db = CompanyDatabase()
-    db.create_tables()  
-    db.initialize_sample_data()
+    # Bring the schema up to date without touching existing data
+    if db.migrate() and db.is_empty():
+        db.initialize_sample_data()
     return db
 
 # Get database instance
-db = get_database()
-
-# Get email instance
-email_bot = EmailAutoReply(EMAIL, PASSWORD)
-#email_bot.connect()
+try:
+    # Rollouts sign acknowledgement links, check for the key before anything gets queued
+    require_secret()
+    db = get_database()
+except RuntimeError as e:
+    # Missing configuration or a migration that refused the existing data, say why instead of a traceback
+    st.error(f"❌ The dashboard cannot start.\n\n{e}")
+    st.stop()
+
+# --- Background Rollouts ---
+@st.cache_resource
+def get_background_services():
+    """Create the job runner and email delivery shared by every dashboard session"""
+    workers = int(os.getenv("DISPATCH_WORKERS", "4"))
+    email_bot = EmailAutoReply(EMAIL, PASSWORD, pool_size=workers)
+    dispatcher = EmailDispatcher(email_bot, workers=workers,
+                                 rate_per_second=float(os.getenv("DISPATCH_RATE", "0")),
+                                 provider_rates=parse_provider_rates(os.getenv("DISPATCH_PROVIDER_RATES", "")))
+    job_runner = JobRunner(db, max_workers=int(os.getenv("JOB_WORKERS", "4")))
+    return job_runner, PolicyRollout(db, DeliveryWorker(db, dispatcher))
+
+job_runner, rollout = get_background_services()
 
 # --- Session State Setup ---
 if 'authenticated' not in st.session_state:
@@ -48,6 +65,10 @@ if 'current_page' not in st.session_state:
     st.session_state.current_page = 'dashboard'
 if 'policy_status_view' not in st.session_state:
     st.session_state.policy_status_view = None
+if 'active_jobs' not in st.session_state:
+    st.session_state.active_jobs = {}
+if 'finished_jobs' not in st.session_state:
+    st.session_state.finished_jobs = {}
 
 # --- Login Screen ---
 def login_page():
@@ -66,138 +87,78 @@ def login_page():
             else:
                 st.error("Please enter valid credentials.")
 
-def parse_email(text):
-    # Extract subject
-    subject_match = re.search(r"Subject:\s*(.*)", text)
-    subject = subject_match.group(1).strip() if subject_match else None
-
-    # Extract body (everything after subject line)
-    parts = re.split(r"Subject:.*?\n\s*\n", text, maxsplit=1)
-    body = parts[1].strip() if len(parts) > 1 else None
-
-    print("Subject:", subject)
-    print("\nBody:\n", body)
-
-    return subject, body
-
-def generate_acknowledgement_links(policy_id, employee_email, base_url="http://localhost:5000"):
+def implement_policy_background(policy):
     """
-    Generate acknowledgement and non-acknowledgement links for email
+    Submit a policy rollout to the background job runner and return immediately
+    Returns: (success: bool, message: str, job_id: int)
     """
-    # Create data payload
-    ack_data = {
-        'policy_id': policy_id,
-        'email': employee_email,
-        'status': 'ack'
-    }
-    
-    nak_data = {
-        'policy_id': policy_id,
-        'email': employee_email,
-        'status': 'nak'
-    }
-    
-    # Encode data as base64 for URL safety
-    ack_encoded = base64.urlsafe_b64encode(json.dumps(ack_data).encode()).decode()
-    nak_encoded = base64.urlsafe_b64encode(json.dumps(nak_data).encode()).decode()
-    
-    # Create links
-    ack_link = f"{base_url}/acknowledge?data={ack_encoded}"
-    nak_link = f"{base_url}/acknowledge?data={nak_encoded}"
-    
-    return ack_link, nak_link
+    job_id = job_runner.submit(int(policy['id']), rollout.run, policy)
+    if job_id is None:
+        return False, "Failed to create background job", None
+    return True, f"Policy #{policy['id']} rollout started", job_id
 
-def create_email_body_with_links(original_body, policy_id, employee_email):
+def implement_policies_background(policies):
     """
-    Modify the email body to include acknowledgement links
+    Submit a bulk rollout of several policies to the background job runner
+    Returns: {policy_id: job_id}
     """
-    ack_link, nak_link = generate_acknowledgement_links(policy_id, employee_email)
-    
-    # Add acknowledgement section to email body
-    acknowledgement_section = f"""
-
-    ---
-
-    POLICY ACKNOWLEDGEMENT REQUIRED:
-
-    Please click one of the following links to acknowledge this policy:
-
-    ✅ I ACKNOWLEDGE and will comply with this policy:
-    {ack_link}
-
-    ❌ I DO NOT ACKNOWLEDGE this policy (requires discussion):
-    {nak_link}
-
-    Important: You must click one of these links to complete your policy acknowledgement.
+    policy_ids = [int(policy['id']) for policy in policies]
+    job_ids = job_runner.submit_batch(policy_ids, rollout.run_bulk, policies)
+    return dict(zip(policy_ids, job_ids))
+
+@st.fragment(run_every=2)
+def job_progress_panel():
+    """Poll background rollouts and show their real delivery counts"""
+    # Fragment reruns get a thread of their own, hand its connection back when done
+    try:
+        render_job_progress()
+    finally:
+        db.close()
 
-    ---
-    """
+def render_job_progress():
+    active_jobs = st.session_state.active_jobs
+    finished_jobs = st.session_state.finished_jobs
     
-    # Append to original body
-    modified_body = original_body + acknowledgement_section
-    return modified_body
-
-def implement_policy_background(policy):
-    """
-    Process and implement policy in the background without opening new page
-    Returns: (success: bool, message: str, email_count: int)
-    """
-    try:
-        # Get recipient emails - this should return employee records, not just emails
-        # We need both email and employee ID for acknowledgement links
-        employees_df = db.search_employees_full(department=policy['department'], work_mode=policy['work_mode'])
-        
-        if employees_df.empty:
-            return False, "No recipients found for this policy", 0
-        
-        # Process with Gemini AI
-        g = gemini_class()
-        gemini_output = g.process_policy(policy['text'])
-        
-        # Parse email content
-        subject, body = parse_email(text=gemini_output)
-        
-        # Send personalized emails with acknowledgement links
-        email_list = []
-        for _, employee in employees_df.iterrows():
-            # Create personalized email body with acknowledgement links
-            personalized_body = create_email_body_with_links(
-                original_body=body,
-                policy_id=policy['id'],
-                employee_email=employee['email']
-            )
-            
-            email_list.append({
-                'email': employee['email'],
-                'subject': subject,
-                'body': personalized_body
-            })
-            #print("Idhar email ha:",email_list['email'])
+    if not active_jobs and not finished_jobs:
+        return
+    
+    st.markdown("### Policy Rollouts")
+    just_finished = False
+    
+    for policy_id, job_id in list(active_jobs.items()):
+        job = db.get_job_status(job_id)
+        if job is None:
+            del active_jobs[policy_id]
+            continue
         
-        # Send all emails
-        success_count = 0
-        for email_data in email_list:
-            try:
-                # Assuming your email_bot has a method to send individual emails
-                print("Idhar email ha:",email_data['email'])
-                email_bot.send_with_followup(
-                    email_data['email'], 
-                    email_data['subject'], 
-                    email_data['body'],
-                    "none"
-                )
-                success_count += 1
-            except Exception as email_error:
-                print(f"Failed to send email to {email_data['email']}: {email_error}")
+        if job['status'] == 'completed':
+            finished_jobs[policy_id] = (True, f"✅ Policy #{policy_id} sent to {job['sent']}/{job['total']} recipients "
+                                              f"({job['failed']} failed, {job['pending']} awaiting retry).")
+        elif job['status'] == 'failed':
+            finished_jobs[policy_id] = (False, f"❌ Error implementing policy #{policy_id}: {job['message']}")
+        else:
+            done = job['sent'] + job['failed']
+            progress = min(done / job['total'], 1.0) if job['total'] else 0.0
+            st.progress(progress, text=f"Policy #{policy_id} - {job['stage']}: "
+                                       f"{job['sent']} sent, {job['failed']} failed of {job['total']}")
+            continue
         
-        # Mark policy as implemented
-        if db.update_policy(policy['id'], status="Implemented"):
-            return True, f"Policy #{policy['id']} successfully implemented and sent to {success_count}/{len(email_list)} recipients!", success_count
+        del active_jobs[policy_id]
+        just_finished = True
+    
+    if just_finished:
+        # Refresh the policy table so the new status shows up
+        st.rerun(scope="app")
+    
+    for policy_id, (success, message) in finished_jobs.items():
+        if success:
+            st.success(message)
         else:
-            return False, "Failed to update policy status in database", success_count
-            
-    except Exception as e:
-        return False, f"Error implementing policy: {str(e)}", 0
+            st.error(message)
+    
+    if finished_jobs and st.button("Clear finished", key="clear_finished_jobs"):
+        finished_jobs.clear()
+        st.rerun(scope="app")
 
 def search_employees_full(self, **kwargs):
     """
@@ -276,46 +237,50 @@ def policy_status_page():
     
     # Get real acknowledgement data from database
     try:
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
-        # Query to get acknowledgement status for this specific policy
-        query = """
-        SELECT 
-            e.id as employee_id,
-            e.name as employee_name,
-            e.email as employee_email,
-            e.department,
-            e.work_mode,
-            a.status,
-            a.updated_at,
-            a.created_at
-        FROM acknowledgements a
-        JOIN employee e ON a.employee_id = e.id
-        WHERE a.policy_id = ?
-        ORDER BY e.name
-        """
-        
-        cursor.execute(query, (policy['id'],))
-        acknowledgement_data = cursor.fetchall()
-        conn.close()
+        counts = db.get_policy_ack_counts(policy['id'])
         
-        if acknowledgement_data:
+        if counts['total']:
             st.markdown("### Policy Recipients Status")
             
-            # Convert data to DataFrame for easier handling
-            columns = ['employee_id', 'employee_name', 'employee_email', 'department', 'work_mode', 'status', 'updated_at', 'created_at']
-            status_df = pd.DataFrame(acknowledgement_data, columns=columns)
-            
             # Display the status table with real data
             st.markdown("#### Recipients and Their Response Status")
             
-            # Add refresh button
-            col_refresh1, col_refresh2 = st.columns([1, 5])
-            with col_refresh1:
+            # Filters are applied in SQL, only the current page is fetched
+            filter_cols = st.columns([1.5, 2.5, 1, 1])
+            with filter_cols[0]:
+                status_filter = st.selectbox("Status", ['All', 'not responded', 'ack', 'nak'], key="recipient_status_filter")
+            with filter_cols[1]:
+                email_search = st.text_input("Search email", key="recipient_email_search")
+            with filter_cols[2]:
+                page_size = st.selectbox("Per page", [25, 50, 100], index=1, key="recipient_page_size")
+            with filter_cols[3]:
+                st.write("")
                 if st.button("🔄 Refresh", type="secondary"):
+                    # Pick up acknowledgements recorded by other processes straight away
+                    db.invalidate_cache()
                     st.rerun()
             
+            # Each page starts after the (name, id) of the previous page's last row;
+            # changing the policy or a filter goes back to the first page
+            filters = (policy['id'], status_filter, email_search, page_size)
+            if st.session_state.get('recipient_filters') != filters:
+                st.session_state.recipient_filters = filters
+                st.session_state.recipient_cursors = [None]
+            cursors = st.session_state.recipient_cursors
+            
+            status_df = db.list_policy_recipients(
+                policy['id'],
+                after=cursors[-1],
+                limit=page_size + 1,
+                status=None if status_filter == 'All' else status_filter,
+                email_search=email_search or None
+            )
+            has_next_page = len(status_df) > page_size
+            status_df = status_df.head(page_size)
+            
+            if status_df.empty:
+                st.info("No recipients match these filters.")
+            
             # Create custom table with status indicators
             for idx, row in status_df.iterrows():
                 cols = st.columns([2.5, 2, 1.5, 2, 1.5])
@@ -365,16 +330,30 @@ def policy_status_page():
                             else:
                                 st.error("Failed to update status")
             
+            # Page navigation
+            nav_cols = st.columns([1, 4, 1])
+            with nav_cols[0]:
+                if st.button("← Previous", disabled=len(cursors) == 1):
+                    cursors.pop()
+                    st.rerun()
+            with nav_cols[1]:
+                st.caption(f"Page {len(cursors)}")
+            with nav_cols[2]:
+                if st.button("Next →", disabled=not has_next_page):
+                    last = status_df.iloc[-1]
+                    cursors.append((last['employee_name'], int(last['employee_id'])))
+                    st.rerun()
+            
             # Summary statistics with real data
             st.write("---")
             st.markdown("### Response Summary")
             
             summary_cols = st.columns(4)
             
-            total_recipients = len(status_df)
-            ack_count = len(status_df[status_df['status'] == 'ack'])
-            nak_count = len(status_df[status_df['status'] == 'nak'])
-            not_responded = len(status_df[status_df['status'] == 'not responded'])
+            total_recipients = counts['total']
+            ack_count = counts['ack']
+            nak_count = counts['nak']
+            not_responded = counts['not responded']
             
             with summary_cols[0]:
                 st.metric("Total Recipients", total_recipients)
@@ -484,12 +463,68 @@ def dashboard_page():
             else:
                 st.error("Please enter policy text.")
 
-    # Get all policies from database
-    policies_df = db.view_policies()
+    # Live progress of background rollouts
+    job_progress_panel()
+
+    total_policies = db.count_policies()
     
-    if not policies_df.empty:
+    if total_policies:
         st.markdown("### Current Policies")
         
+        active_policy_ids = list(st.session_state.active_jobs)
+        pending_filters = {'status': "Not Implemented", 'exclude_ids': active_policy_ids}
+        pending_count = db.count_policies(pending_filters)
+        if pending_count:
+            if st.button(f"🚀 Implement all pending ({pending_count})", key="implement_all", type="primary"):
+                pending_policies = [
+                    {
+                        'id': row['id'],
+                        'text': row['policy_text'],
+                        'department': row['department'],
+                        'work_mode': row['work_mode']
+                    }
+                    for _, row in db.list_policies(limit=None, filters=pending_filters).iterrows()
+                ]
+                started = implement_policies_background(pending_policies)
+                if started:
+                    st.session_state.active_jobs.update(started)
+                    st.rerun()
+                else:
+                    st.error("Failed to create background jobs")
+        
+        # Filters are applied in SQL, only the current page is fetched and drawn
+        filter_cols = st.columns([1.5, 1.5, 3, 1])
+        with filter_cols[0]:
+            status_filter = st.selectbox("Status", ["All", "Not Implemented", "Implemented"], key="policy_status_filter")
+        with filter_cols[1]:
+            department_filter = st.selectbox("Department", ["All", "HR", "IT", "Compliance", "Finance", "Operations"],
+                                             key="policy_department_filter")
+        with filter_cols[2]:
+            search = st.text_input("Search policies", key="policy_search")
+        with filter_cols[3]:
+            page_size = st.selectbox("Per page", [10, 25, 50], index=1, key="policy_page_size")
+        
+        filters = {
+            'status': None if status_filter == "All" else status_filter,
+            'department': None if department_filter == "All" else department_filter,
+            'search': search or None
+        }
+        
+        # Each page starts after the last policy ID of the previous one;
+        # changing a filter goes back to the first page
+        filter_key = (status_filter, department_filter, search, page_size)
+        if st.session_state.get('policy_filters') != filter_key:
+            st.session_state.policy_filters = filter_key
+            st.session_state.policy_cursors = [None]
+        cursors = st.session_state.policy_cursors
+        
+        policies_df = db.list_policies(cursor=cursors[-1], limit=page_size + 1, filters=filters)
+        has_next_page = len(policies_df) > page_size
+        policies_df = policies_df.head(page_size)
+        
+        if policies_df.empty:
+            st.info("No policies match these filters.")
+        
         # Create header row
         header_cols = st.columns([0.5, 3, 1.2, 1.2, 1.5, 3])
         header_cols[0].markdown("**ID**")
@@ -546,7 +581,9 @@ def dashboard_page():
                 
                 # MODIFIED: Implement button with background processing
                 with action_cols[3]:
-                    if row['status'] == "Not Implemented":
+                    if int(row['id']) in st.session_state.active_jobs:
+                        st.markdown("⏳ **Rolling out**")
+                    elif row['status'] == "Not Implemented":
                         if st.button("🚀 Implement", key=f"implement_{row['id']}", type="primary"):
                             # Create policy object for background processing
                             policy = {
@@ -556,48 +593,12 @@ def dashboard_page():
                                 'work_mode': row['work_mode']
                             }
                             
-                            # Create placeholders for status updates
-                            status_placeholder = st.empty()
-                            progress_bar = st.progress(0)
-                            
-                            try:
-                                implement_policy_background(policy)
-                            #     # Step 1: Finding recipients
-                                status_placeholder.info("📋 Finding recipients...")
-                                progress_bar.progress(20)
-                                time.sleep(0.5)  # Brief pause for visual feedback
-                                
-                                
-                            #     # Step 2: Processing with AI
-                                status_placeholder.info("🤖 Processing with AI...")
-                                progress_bar.progress(40)
-                                time.sleep(0.5)
-                            
-                                
-                            #     # Step 3: Sending emails
-                                status_placeholder.info("📧 Sending emails...")
-                                progress_bar.progress(70)
-                                time.sleep(0.5)
-                                
-                                
-                            #     # Step 4: Updating database
-                                status_placeholder.info("💾 Updating database...")
-                                progress_bar.progress(90)
-                                time.sleep(0.5)
-                                
-                                
-                            #     # Success
-                                progress_bar.progress(100)
-                                status_placeholder.success(f"✅ Policy #{policy['id']} implemented successfully! Sent to  recipients.")
-                                time.sleep(0.5)
+                            success, message, job_id = implement_policy_background(policy)
+                            if success:
+                                st.session_state.active_jobs[int(row['id'])] = job_id
                                 st.rerun()
-                                
-                                
-                            except Exception as e:
-                                status_placeholder.error(f"❌ Error implementing policy: {str(e)}")
-                                progress_bar.empty()
-                                time.sleep(3)
-                                status_placeholder.empty()
+                            else:
+                                st.error(message)
                     else:
                         st.markdown("✅ **Done**")
 
@@ -668,19 +669,31 @@ def dashboard_page():
                     
                     st.write("---")
 
+        # Page navigation
+        nav_cols = st.columns([1, 4, 1])
+        with nav_cols[0]:
+            if st.button("← Previous", key="policies_previous", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+        with nav_cols[1]:
+            st.caption(f"Page {len(cursors)} · {total_policies} policies in total")
+        with nav_cols[2]:
+            if st.button("Next →", key="policies_next", disabled=not has_next_page):
+                cursors.append(int(policies_df.iloc[-1]['id']))
+                st.rerun()
+
     else:
         st.info("No policies found in the database.")
 
     # Policy Statistics
-    if not policies_df.empty:
+    if total_policies:
         st.markdown("### Policy Statistics")
         
         stats_cols = st.columns(4)
         
-        total_policies = len(policies_df)
-        implemented = len(policies_df[policies_df['status'] == 'Implemented'])
-        not_implemented = len(policies_df[policies_df['status'] == 'Not Implemented'])
-        implementation_rate = (implemented / total_policies * 100) if total_policies > 0 else 0
+        status_totals = dict(db.get_policy_status_totals())
+        implemented, total_policies, implementation_rate = db.get_implementation_rate()
+        not_implemented = status_totals.get('Not Implemented', 0)
         
         with stats_cols[0]:
             st.metric("Total Policies", total_policies)
@@ -695,25 +708,32 @@ def dashboard_page():
             st.metric("Implementation Rate", f"{implementation_rate:.1f}%")
 
         # Department-wise breakdown
-        if 'department' in policies_df.columns:
+        dept_matrix = db.get_department_status_matrix()
+        if dept_matrix:
             st.markdown("### Department-wise Policy Distribution")
-            dept_stats = policies_df.groupby(['department', 'status']).size().unstack(fill_value=0)
+            dept_stats = pd.DataFrame(dept_matrix, columns=['department', 'status', 'count']).pivot(
+                index='department', columns='status', values='count').fillna(0).astype(int)
             st.bar_chart(dept_stats)
 
 # --- Main Application Logic ---
-if not st.session_state.authenticated:
-    login_page()
-else:
-    # Handle different pages based on current_page session state
-    if st.session_state.current_page == 'dashboard':
-        dashboard_page()
-    elif st.session_state.current_page == 'policy_status':
-        policy_status_page()
+# Every rerun runs on a new thread; return its connection to the pool at the end,
+# including when the run is cut short by st.rerun()
+try:
+    if not st.session_state.authenticated:
+        login_page()
     else:
-        # Fallback to dashboard if unknown page
-        st.session_state.current_page = 'dashboard'
-        dashboard_page()
+        # Handle different pages based on current_page session state
+        if st.session_state.current_page == 'dashboard':
+            dashboard_page()
+        elif st.session_state.current_page == 'policy_status':
+            policy_status_page()
+        else:
+            # Fallback to dashboard if unknown page
+            st.session_state.current_page = 'dashboard'
+            dashboard_page()
 
-# --- Footer ---
-st.markdown("---")
-st.caption(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
\ No newline at end of file
+    # --- Footer ---
+    st.markdown("---")
+    st.caption(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+finally:
+    db.close()
@@ -0,0 +1,274 @@
+"""
+Offline benchmarks for the policy pipeline. Each run works on a throwaway
+SQLite file, never on company.db.
+
+    python benchmark.py rollout --employees 5000 --backend stub --llm-latency 1.5
+    python benchmark.py indexes --employees 1000000
+    python benchmark.py bulk-insert --employees 100000 --policies 200
+    python benchmark.py ack-page --requests 2000
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import random
+import tempfile
+import time
+from db import CompanyDatabase
+
+
+def make_database(tmpdir, name="bench.db"):
+    db = CompanyDatabase(os.path.join(tmpdir, name))
+    db.create_tables()
+    return db
+
+
+def fake_employees(count, department="IT", work_mode="Remote"):
+    return [
+        (f"Employee {i}", 30, "Female", "Engineer", department, work_mode, f"employee{i}@example.com")
+        for i in range(count)
+    ]
+
+
+class NullEmailBot:
+    """Stands in for EmailAutoReply, sleeping instead of talking to an SMTP server"""
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def send_email(self, recipient, subject, body):
+        if self.latency:
+            time.sleep(self.latency)
+
+
+def bench_rollout(args):
+    """End-to-end implement throughput: generate, queue and deliver one policy"""
+    from delivery_worker import DeliveryWorker
+    from dispatcher import EmailDispatcher
+    from gemini import PolicyEmailCache, gemini_class, get_backend
+    from rollout import PolicyRollout
+    import tokens
+    if not tokens.ACK_SECRET:
+        tokens.ACK_SECRET = "benchmark"
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = make_database(tmpdir)
+        db.insert_employees_bulk(fake_employees(args.employees))
+        db.insert_policy("Benchmark policy: lock your screen when away.", "IT", "Remote", "Not Implemented")
+
+        os.environ["LLM_STUB_LATENCY"] = str(args.llm_latency)
+        backend = get_backend(args.backend)
+        cache = PolicyEmailCache(CompanyDatabase(os.path.join(tmpdir, "cache.db")))
+        dispatcher = EmailDispatcher(NullEmailBot(args.smtp_latency), workers=args.workers)
+        rollout = PolicyRollout(db, DeliveryWorker(db, dispatcher, batch_size=500),
+                                llm_factory=lambda: gemini_class(cache=cache, backend=backend))
+
+        policy = {'id': 1, 'text': "Benchmark policy: lock your screen when away.",
+                  'department': "IT", 'work_mode': "Remote"}
+        job_id = db.create_job(1)
+        start = time.perf_counter()
+        rollout.run(job_id, policy)
+        elapsed = time.perf_counter() - start
+
+        status = db.get_job_status(job_id)
+        print(f"\nbackend={backend.model_name} employees={args.employees} workers={args.workers}")
+        print(f"sent {status['sent']}/{status['total']} in {elapsed:.2f}s "
+              f"({status['sent'] / elapsed:.0f} emails/s)")
+
+
+def time_query(conn, sql, params, repeat):
+    """Average milliseconds per execution of a query, fully fetched"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        conn.execute(sql, params).fetchall()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench_indexes(args):
+    """Audience, email and status query times with and without the schema indexes"""
+    departments = ["HR", "IT", "Compliance", "Finance", "Operations"]
+    queries = [
+        ("audience (department, work_mode)",
+         "SELECT id FROM employee WHERE department = ? AND work_mode = ?", ("Finance", "Onsite")),
+        ("employee by email",
+         "SELECT id FROM employee WHERE email = ?", (f"employee{args.employees // 2}@example.com",)),
+        ("not responded for policy",
+         "SELECT COUNT(*) FROM acknowledgements WHERE status = ? AND policy_id = ?", ("not responded", 1)),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = make_database(tmpdir)
+        conn = db.get_connection()
+        for name in ["idx_employee_department_work_mode", "idx_employee_email", "idx_acknowledgements_status_policy"]:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+        rng = random.Random(0)
+        conn.executemany(
+            "INSERT INTO employee (name, age, gender, position, department, work_mode, email) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((f"Employee {i}", 30, "Female", "Engineer", rng.choice(departments),
+              rng.choice(["Remote", "Onsite"]), f"employee{i}@example.com") for i in range(args.employees)))
+        conn.executemany("INSERT INTO policies (policy_text, department, work_mode, status) VALUES (?, ?, ?, ?)",
+                         [(f"Policy {p}", None, None, "Implemented") for p in range(1, 6)])
+        conn.execute("""
+        INSERT INTO acknowledgements (policy_id, employee_id, status)
+        SELECT p.id, e.id, CASE WHEN e.id % 3 = 0 THEN 'ack' ELSE 'not responded' END
+        FROM policies p CROSS JOIN employee e
+        """)
+        conn.commit()
+
+        before = [time_query(conn, sql, params, args.repeat) for _, sql, params in queries]
+        conn.close()
+        db.create_indexes()
+        conn = db.get_connection()
+        conn.execute("ANALYZE")
+        after = [time_query(conn, sql, params, args.repeat) for _, sql, params in queries]
+        conn.close()
+
+    print(f"\n{args.employees} employees, 5 policies, avg of {args.repeat} runs")
+    print(f"{'query':<36}{'no index (ms)':>15}{'indexed (ms)':>15}{'speedup':>10}")
+    for (label, _, _), b, a in zip(queries, before, after):
+        print(f"{label:<36}{b:>15.2f}{a:>15.2f}{b / a:>9.0f}x")
+
+
+def legacy_insert_policies_bulk(db, policies):
+    """The previous insert_policies_bulk: pull matching IDs into Python, executemany them back"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    for policy_text, department, work_mode, status in policies:
+        cursor.execute("INSERT INTO policies (policy_text, department, work_mode, status) VALUES (?, ?, ?, ?)",
+                       (policy_text, department, work_mode, status))
+        policy_id = cursor.lastrowid
+        conditions, params = [], []
+        if department:
+            conditions.append("department = ?")
+            params.append(department)
+        if work_mode:
+            conditions.append("work_mode = ?")
+            params.append(work_mode)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        employee_ids = [row[0] for row in conn.execute(f"SELECT id FROM employee {where}", params)]
+        cursor.executemany("INSERT INTO acknowledgements (policy_id, employee_id, status) VALUES (?, ?, ?)",
+                           [(policy_id, employee_id, 'not responded') for employee_id in employee_ids])
+    conn.commit()
+    conn.close()
+
+
+def bench_bulk_insert(args):
+    """insert_policies_bulk with set-based audience expansion vs the per-ID Python loop"""
+    departments = ["HR", "IT", "Compliance", "Finance", "Operations"]
+    rng = random.Random(0)
+    employees = [
+        (f"Employee {i}", 30, "Female", "Engineer", rng.choice(departments),
+         rng.choice(["Remote", "Onsite"]), f"employee{i}@example.com")
+        for i in range(args.employees)
+    ]
+    policies = [
+        (f"Policy {p}", rng.choice(departments + [None]), rng.choice(["Remote", "Onsite", None]), "Not Implemented")
+        for p in range(args.policies)
+    ]
+
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for label, load in [("python loop", lambda db: legacy_insert_policies_bulk(db, policies)),
+                            ("insert ... select", lambda db: db.insert_policies_bulk(policies))]:
+            db = make_database(tmpdir, f"{label.replace(' ', '_')}.db")
+            db.insert_employees_bulk(employees)
+            start = time.perf_counter()
+            load(db)
+            timings[label] = time.perf_counter() - start
+            with db.connection() as conn:
+                rows = conn.execute("SELECT COUNT(*) FROM acknowledgements").fetchone()[0]
+            db.close()
+            print(f"{label}: {rows} acknowledgement rows")
+
+    print(f"\n{args.policies} policies against {args.employees} employees")
+    for label, seconds in timings.items():
+        print(f"{label:<20}{seconds:>8.2f}s")
+    print(f"speedup {timings['python loop'] / timings['insert ... select']:.1f}x")
+
+
+def bench_ack_page(args):
+    """/acknowledge latency with templates parsed per request vs compiled once"""
+    from flask import render_template_string
+    import tokens
+    if not tokens.ACK_SECRET:
+        tokens.ACK_SECRET = "benchmark"
+    import flask_app
+
+    def legacy_page_response(**context):
+        return render_template_string(flask_app.SUCCESS_TEMPLATE, **context)
+
+    def legacy_error_response(name):
+        title, message, status = flask_app.ERROR_PAGE_CONTENT[name]
+        return render_template_string(flask_app.SUCCESS_TEMPLATE, title=title, message=message,
+                                      icon="❌", icon_class="error-icon", details=None), status
+
+    variants = [
+        ("render_template_string", legacy_page_response, legacy_error_response),
+        ("precompiled", flask_app.page_response, flask_app.error_response),
+    ]
+    logging.disable(logging.WARNING)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir, contextlib.redirect_stdout(io.StringIO()):
+        db = make_database(tmpdir)
+        db.insert_employees_bulk(fake_employees(args.requests))
+        db.insert_policy("Benchmark policy", "IT", "Remote", "Implemented")
+        flask_app.db = db
+        flask_app.ack_writer.db = db
+        client = flask_app.app.test_client()
+        scenarios = {
+            "ack (token + UPDATE + page)": [f"/acknowledge?t={tokens.make_token(1, i, 'ack')}"
+                                           for i in range(1, args.requests + 1)],
+            "invalid token (error page)": ["/acknowledge?t=not-a-token"] * args.requests,
+        }
+
+        for label, page_response, error_response in variants:
+            flask_app.page_response, flask_app.error_response = page_response, error_response
+            for scenario, urls in scenarios.items():
+                client.get(urls[0])
+                start = time.perf_counter()
+                for url in urls:
+                    client.get(url)
+                results[(label, scenario)] = (time.perf_counter() - start) / len(urls) * 1e6
+        db.close()
+    logging.disable(logging.NOTSET)
+
+    print(f"\n{args.requests} sequential requests per scenario, mean latency")
+    print(f"{'scenario':<30}{'per request parse (us)':>24}{'precompiled (us)':>18}{'speedup':>10}")
+    for scenario in scenarios:
+        before, after = results[("render_template_string", scenario)], results[("precompiled", scenario)]
+        print(f"{scenario:<30}{before:>24.0f}{after:>18.0f}{before / after:>9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rollout = sub.add_parser("rollout", help=bench_rollout.__doc__)
+    rollout.add_argument("--employees", type=int, default=1000)
+    rollout.add_argument("--backend", default="stub", help="LLM backend: stub or gemini")
+    rollout.add_argument("--llm-latency", type=float, default=0.0, help="Artificial stub latency in seconds")
+    rollout.add_argument("--smtp-latency", type=float, default=0.0, help="Simulated seconds per SMTP send")
+    rollout.add_argument("--workers", type=int, default=4)
+    rollout.set_defaults(func=bench_rollout)
+
+    indexes = sub.add_parser("indexes", help=bench_indexes.__doc__)
+    indexes.add_argument("--employees", type=int, default=1000000)
+    indexes.add_argument("--repeat", type=int, default=5)
+    indexes.set_defaults(func=bench_indexes)
+
+    bulk = sub.add_parser("bulk-insert", help=bench_bulk_insert.__doc__)
+    bulk.add_argument("--employees", type=int, default=100000)
+    bulk.add_argument("--policies", type=int, default=200)
+    bulk.set_defaults(func=bench_bulk_insert)
+
+    ack = sub.add_parser("ack-page", help=bench_ack_page.__doc__)
+    ack.add_argument("--requests", type=int, default=2000)
+    ack.set_defaults(func=bench_ack_page)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,78 +1,530 @@
 import sqlite3
+import threading
+import time
 import pandas as pd
-from typing import List, Tuple, Optional
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Iterator, List, Tuple, Optional
+
+LOOKUP_INDEXES = [
+    # Policy audience: department + work mode (also serves department-only filters)
+    "CREATE INDEX IF NOT EXISTS idx_employee_department_work_mode ON employee (department, work_mode);",
+    # Acknowledgement links resolve employees by email
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_employee_email ON employee (email);",
+    # Outstanding / responded counts per policy
+    "CREATE INDEX IF NOT EXISTS idx_acknowledgements_status_policy ON acknowledgements (status, policy_id);",
+]
+
+def check_unique_emails(conn):
+    """Migration 4 makes employee emails unique; refuse with a readable message instead of an IntegrityError"""
+    duplicates = conn.execute("""
+    SELECT email, COUNT(*) FROM employee
+    WHERE email IS NOT NULL GROUP BY email HAVING COUNT(*) > 1 ORDER BY email
+    """).fetchall()
+    if duplicates:
+        listing = "\n".join(f"  {email} ({count} employees)" for email, count in duplicates)
+        raise RuntimeError(
+            "Cannot add the unique employee email index, these addresses are used more than once:\n"
+            f"{listing}\n"
+            "Give each employee their own address (or delete the duplicates) and start again.")
+
+
+# Run inside a migration's transaction before its statements; raise to stop migrating
+MIGRATION_CHECKS = {
+    4: check_unique_emails,
+}
+
+# Forward-only schema migrations as (version, description, statements).
+# Released entries must never be edited; append a new version instead.
+MIGRATIONS = [
+    (1, "employee, policies and acknowledgements tables", [
+        """
+        CREATE TABLE IF NOT EXISTS employee (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            age INTEGER,
+            gender TEXT,
+            position TEXT,
+            department TEXT,
+            work_mode TEXT CHECK(work_mode IN ('Remote', 'Onsite')),
+            email TEXT
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS policies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            policy_text TEXT NOT NULL,
+            department TEXT,
+            work_mode TEXT CHECK(work_mode IN ('Remote', 'Onsite')),
+            status TEXT CHECK(status IN ('Implemented', 'Not Implemented'))
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS acknowledgements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            policy_id INTEGER NOT NULL,
+            employee_id INTEGER NOT NULL,
+            status TEXT CHECK(status IN ('ack', 'nak', 'not responded')) DEFAULT 'not responded',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (policy_id) REFERENCES policies (id) ON DELETE CASCADE,
+            FOREIGN KEY (employee_id) REFERENCES employee (id) ON DELETE CASCADE,
+            UNIQUE(policy_id, employee_id)
+        );
+        """,
+    ]),
+    (2, "outbox table for policy email delivery", [
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            policy_id INTEGER NOT NULL,
+            employee_id INTEGER NOT NULL,
+            recipient TEXT NOT NULL,
+            subject TEXT,
+            body TEXT,
+            status TEXT CHECK(status IN ('pending', 'sending', 'sent', 'failed')) DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            last_error TEXT,
+            next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (policy_id) REFERENCES policies (id) ON DELETE CASCADE,
+            FOREIGN KEY (employee_id) REFERENCES employee (id) ON DELETE CASCADE,
+            UNIQUE(policy_id, employee_id)
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at);",
+    ]),
+    (3, "jobs table for background policy rollouts", [
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            policy_id INTEGER NOT NULL,
+            status TEXT CHECK(status IN ('queued', 'running', 'completed', 'failed')) DEFAULT 'queued',
+            stage TEXT,
+            total INTEGER DEFAULT 0,
+            message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (policy_id) REFERENCES policies (id) ON DELETE CASCADE
+        );
+        """,
+    ]),
+    (4, "audience, email and acknowledgement status indexes", LOOKUP_INDEXES),
+    (5, "per-policy acknowledgement counters maintained by triggers", [
+        """
+        CREATE TABLE IF NOT EXISTS policy_ack_counts (
+            policy_id INTEGER PRIMARY KEY,
+            ack_count INTEGER NOT NULL DEFAULT 0,
+            nak_count INTEGER NOT NULL DEFAULT 0,
+            not_responded_count INTEGER NOT NULL DEFAULT 0
+        );
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_ack_counts_insert AFTER INSERT ON acknowledgements
+        BEGIN
+            INSERT OR IGNORE INTO policy_ack_counts (policy_id) VALUES (NEW.policy_id);
+            UPDATE policy_ack_counts
+            SET ack_count = ack_count + (NEW.status = 'ack'),
+                nak_count = nak_count + (NEW.status = 'nak'),
+                not_responded_count = not_responded_count + (NEW.status = 'not responded')
+            WHERE policy_id = NEW.policy_id;
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_ack_counts_delete AFTER DELETE ON acknowledgements
+        BEGIN
+            UPDATE policy_ack_counts
+            SET ack_count = ack_count - (OLD.status = 'ack'),
+                nak_count = nak_count - (OLD.status = 'nak'),
+                not_responded_count = not_responded_count - (OLD.status = 'not responded')
+            WHERE policy_id = OLD.policy_id;
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_ack_counts_update AFTER UPDATE OF status ON acknowledgements
+        WHEN OLD.status IS NOT NEW.status
+        BEGIN
+            UPDATE policy_ack_counts
+            SET ack_count = ack_count + (NEW.status = 'ack') - (OLD.status = 'ack'),
+                nak_count = nak_count + (NEW.status = 'nak') - (OLD.status = 'nak'),
+                not_responded_count = not_responded_count
+                    + (NEW.status = 'not responded') - (OLD.status = 'not responded')
+            WHERE policy_id = NEW.policy_id;
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_ack_counts_policy_delete AFTER DELETE ON policies
+        BEGIN
+            DELETE FROM policy_ack_counts WHERE policy_id = OLD.id;
+        END;
+        """,
+        # Backfill counters for acknowledgements that predate the triggers
+        """
+        INSERT OR REPLACE INTO policy_ack_counts (policy_id, ack_count, nak_count, not_responded_count)
+        SELECT policy_id, SUM(status = 'ack'), SUM(status = 'nak'), SUM(status = 'not responded')
+        FROM acknowledgements
+        GROUP BY policy_id;
+        """,
+    ]),
+    (6, "employee name index for keyset-paginated recipient lists", [
+        "CREATE INDEX IF NOT EXISTS idx_employee_name ON employee (name);",
+    ]),
+    (7, "policy status indexes for dashboard aggregates", [
+        "CREATE INDEX IF NOT EXISTS idx_policies_status ON policies (status);",
+        "CREATE INDEX IF NOT EXISTS idx_policies_department_status ON policies (department, status);",
+    ]),
+    (8, "reminders table and per-policy reminder cadence", [
+        # Comma separated days after rollout, e.g. '3,7,14'; NULL uses the scheduler default
+        "ALTER TABLE policies ADD COLUMN reminder_days TEXT;",
+        """
+        CREATE TABLE IF NOT EXISTS reminders (
+            acknowledgement_id INTEGER PRIMARY KEY,
+            policy_id INTEGER NOT NULL,
+            employee_id INTEGER NOT NULL,
+            scheduled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            reminders_sent INTEGER DEFAULT 0,
+            next_due_at TIMESTAMP,
+            last_sent_at TIMESTAMP,
+            last_error TEXT,
+            FOREIGN KEY (acknowledgement_id) REFERENCES acknowledgements (id) ON DELETE CASCADE
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_reminders_policy_due ON reminders (policy_id, next_due_at);",
+        # Stop reminding as soon as someone responds or their acknowledgement goes away
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_reminders_responded
+        AFTER UPDATE OF status ON acknowledgements WHEN NEW.status != 'not responded'
+        BEGIN
+            DELETE FROM reminders WHERE acknowledgement_id = NEW.id;
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_reminders_ack_delete AFTER DELETE ON acknowledgements
+        BEGIN
+            DELETE FROM reminders WHERE acknowledgement_id = OLD.id;
+        END;
+        """,
+    ]),
+    (9, "reminder indexes for per-employee digests", [
+        "CREATE INDEX IF NOT EXISTS idx_reminders_due ON reminders (next_due_at);",
+        "CREATE INDEX IF NOT EXISTS idx_reminders_employee ON reminders (employee_id, next_due_at);",
+    ]),
+    (10, "partition leases for sharded scheduler and delivery workers", [
+        """
+        CREATE TABLE IF NOT EXISTS worker_leases (
+            partition INTEGER PRIMARY KEY,
+            worker_id TEXT,
+            lease_expires_at TIMESTAMP
+        );
+        """,
+        # Live workers, including ones still waiting for a partition, so shares can be rebalanced
+        """
+        CREATE TABLE IF NOT EXISTS lease_workers (
+            worker_id TEXT PRIMARY KEY,
+            expires_at TIMESTAMP
+        );
+        """,
+    ]),
+    (11, "IMAP reply scanner position per mailbox", [
+        """
+        CREATE TABLE IF NOT EXISTS imap_sync_state (
+            mailbox TEXT PRIMARY KEY,
+            uid_validity INTEGER NOT NULL,
+            last_uid INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+    ]),
+    (12, "generated policy email cache", [
+        """
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used_at);",
+    ]),
+    (13, "outbox claim owner for sharded delivery workers", [
+        # Worker that moved the email to 'sending'; NULL for unsharded workers
+        "ALTER TABLE outbox ADD COLUMN claimed_by TEXT;",
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Sharded workers split outbox and reminder work by employee_id % LEASE_PARTITIONS;
+# every worker must agree on this number
+LEASE_PARTITIONS = 64
+
+# Restricts work rows to the partitions a worker currently holds an unexpired lease on
+LEASED_BY_WORKER = """
+    ({column} % {partitions}) IN (
+        SELECT partition FROM worker_leases
+        WHERE worker_id = ? AND lease_expires_at > CURRENT_TIMESTAMP
+    )
+"""
+
+# True when policy p targets employee e; an empty department or work mode targets everyone
+POLICY_TARGETS_EMPLOYEE = """
+    (p.department IS NULL OR p.department = '' OR p.department = e.department)
+    AND (p.work_mode IS NULL OR p.work_mode = '' OR p.work_mode = e.work_mode)
+"""
+
+# Applied to every connection: WAL lets readers run alongside the single writer,
+# and busy_timeout makes writers wait for the lock instead of failing
+CONNECTION_PRAGMAS = [
+    "PRAGMA journal_mode = WAL;",
+    "PRAGMA synchronous = NORMAL;",
+    "PRAGMA busy_timeout = 5000;",
+    "PRAGMA cache_size = -16000;",
+    "PRAGMA temp_store = MEMORY;",
+]
+
+
+def cached_read(method):
+    """
+    Serve repeated calls from the read cache until a write bumps the generation
+    (or the entry is older than cache_ttl, which covers other processes' writes)
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = repr((method.__name__, args, sorted(kwargs.items())))
+        with self._cache_lock:
+            generation = self._generation
+            entry = self._read_cache.get(key)
+            if entry and entry[0] == generation and time.monotonic() - entry[1] < self.cache_ttl:
+                self._read_cache.move_to_end(key)
+                result = entry[2]
+                return result.copy() if hasattr(result, 'copy') else result
+        
+        result = method(self, *args, **kwargs)
+        with self._cache_lock:
+            # A write that landed while we were reading has moved the generation on
+            if generation == self._generation:
+                self._read_cache[key] = (generation, time.monotonic(), result)
+                self._read_cache.move_to_end(key)
+                while len(self._read_cache) > self.cache_size:
+                    self._read_cache.popitem(last=False)
+        return result.copy() if hasattr(result, 'copy') else result
+    return wrapper
+
+
+def invalidates_cache(method):
+    """Drop every cached read once a write method has run"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.invalidate_cache()
+    return wrapper
+
 
 class CompanyDatabase:
-    def __init__(self, db_name: str = "company.db"):
+    def __init__(self, db_name: str = "company.db", cache_size: int = 256, cache_ttl: float = 30,
+                 pool_size: int = 8):
         self.db_name = db_name
+        self._local = threading.local()
+        # Connections handed back by close(), reused by the next thread that needs one
+        self.pool_size = pool_size
+        self._pool = []
+        self._pool_lock = threading.Lock()
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._generation = 0
+        self._read_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
     
     def get_connection(self):
-        """Create and return a database connection"""
-        return sqlite3.connect(self.db_name)
+        """Create and return a new tuned database connection (the caller must close it)"""
+        # Pooled connections move between threads, though only one uses them at a time
+        conn = sqlite3.connect(self.db_name, timeout=5, check_same_thread=False)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
     
-    def create_tables(self):
-        """Create employee, policies, and acknowledgements tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def _connection(self):
+        """Return this thread's connection, taking one from the pool (or opening one) on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._pool_lock:
+                conn = self._pool.pop() if self._pool else None
+            if conn is None:
+                conn = self.get_connection()
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        """Borrow this thread's connection for reads (do not close it)"""
+        yield self._connection()
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Run a block as one write transaction on this thread's connection.
+        The write lock is taken up front; commits on success, rolls back on error.
+        Nested blocks join the outermost one, which commits.
+        """
+        conn = self._connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+        if conn.in_transaction:
+            # Left open by an implicit transaction; finish it so BEGIN IMMEDIATE can start ours
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        finally:
+            self._local.depth = 0
+    
+    def close(self):
+        """
+        Hand this thread's connection back to the pool (closing it once the pool is full).
+        Short-lived threads, such as each Streamlit script run, call this when they finish.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        self._local.depth = 0
+        if conn.in_transaction:
+            conn.rollback()
+        with self._pool_lock:
+            if len(self._pool) < self.pool_size:
+                self._pool.append(conn)
+                return
+        conn.close()
+    
+    def invalidate_cache(self):
+        """Start a new cache generation so every cached read is fetched again"""
+        with self._cache_lock:
+            self._generation += 1
+            self._read_cache.clear()
+    
+    def get_schema_version(self) -> int:
+        """Return the highest applied migration version (0 for a database without one)"""
+        conn = self._connection()
         
         try:
-            # Drop tables if they already exist (for reruns)
-            cursor.execute("DROP TABLE IF EXISTS acknowledgements;")
-            cursor.execute("DROP TABLE IF EXISTS employee;")
-            cursor.execute("DROP TABLE IF EXISTS policies;")
+            row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+            return row[0] or 0
+        except sqlite3.OperationalError:
+            # schema_version table does not exist yet
+            return 0
+    
+    @invalidates_cache
+    def migrate(self) -> int:
+        """
+        Apply pending migrations in order, each in its own transaction. Safe to run from
+        several processes at once: the version is re-checked under the write lock.
+        Returns the number applied; a current database costs one version query.
+        """
+        current = self.get_schema_version()
+        if current >= SCHEMA_VERSION:
+            return 0
+        
+        applied = 0
+        
+        try:
+            with self.transaction() as conn:
+                conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                """)
             
-            # Create employee table
-            cursor.execute("""
-            CREATE TABLE employee (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                age INTEGER,
-                gender TEXT,
-                position TEXT,
-                department TEXT,
-                work_mode TEXT CHECK(work_mode IN ('Remote', 'Onsite')),
-                email 
-            );
-            """)
+            for version, description, statements in MIGRATIONS:
+                if version <= current:
+                    continue
+                
+                with self.transaction() as conn:
+                    # Another process may have applied it while we waited for the write lock
+                    latest = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+                    if latest >= version:
+                        continue
+                    if version in MIGRATION_CHECKS:
+                        MIGRATION_CHECKS[version](conn)
+                    for statement in statements:
+                        conn.execute(statement)
+                    conn.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                                 (version, description))
+                applied += 1
+                print(f"✅ Applied migration {version}: {description}")
             
-            # Create policies table
-            cursor.execute("""
-            CREATE TABLE policies (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                policy_text TEXT NOT NULL,
-                department TEXT,
-                work_mode TEXT CHECK(work_mode IN ('Remote', 'Onsite')),
-                status TEXT CHECK(status IN ('Implemented', 'Not Implemented'))
-            );
-            """)
+            return applied
             
-            # Create acknowledgements table
-            cursor.execute("""
-            CREATE TABLE acknowledgements (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                policy_id INTEGER NOT NULL,
-                employee_id INTEGER NOT NULL,
-                status TEXT CHECK(status IN ('ack', 'nak', 'not responded')) DEFAULT 'not responded',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (policy_id) REFERENCES policies (id) ON DELETE CASCADE,
-                FOREIGN KEY (employee_id) REFERENCES employee (id) ON DELETE CASCADE,
-                UNIQUE(policy_id, employee_id)
-            );
-            """)
+        except (sqlite3.Error, RuntimeError) as e:
+            print(f"❌ Error applying migrations: {e}")
+            raise
+    
+    @invalidates_cache
+    def create_tables(self):
+        """Drop every table and rebuild the schema from scratch (deletes all data)"""
+        conn = self._connection()
+        cursor = conn.cursor()
+        
+        try:
+            # Drop tables if they already exist (for reruns)
+            for table in ["llm_cache", "imap_sync_state", "lease_workers", "worker_leases", "reminders", "policy_ack_counts", "jobs", "outbox", "acknowledgements", "employee",
+                          "policies", "schema_version"]:
+                cursor.execute(f"DROP TABLE IF EXISTS {table};")
+            conn.commit()
             
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"❌ Error dropping tables: {e}")
+        
+        self.migrate()
+        print("✅ Tables created successfully.")
+    
+    def create_indexes(self):
+        """Create lookup indexes for audience, login-link and status queries (safe to rerun)"""
+        conn = self._connection()
+        cursor = conn.cursor()
+        
+        try:
+            for statement in LOOKUP_INDEXES:
+                cursor.execute(statement)
             conn.commit()
-            print("✅ Tables created successfully.")
+            print("✅ Indexes created successfully.")
             
         except sqlite3.Error as e:
-            print(f"❌ Error creating tables: {e}")
-        finally:
-            conn.close()
+            conn.rollback()
+            print(f"❌ Error creating indexes: {e}")
+    
+    def is_empty(self) -> bool:
+        """True when no employees or policies have been loaded yet"""
+        conn = self._connection()
+        row = conn.execute("""
+        SELECT NOT EXISTS (SELECT 1 FROM employee) AND NOT EXISTS (SELECT 1 FROM policies)
+        """).fetchone()
+        return bool(row[0])
     
+    @invalidates_cache
     def insert_employee(self, name: str, age: int, gender: str, position: str, 
                        department: str, work_mode: str, email: str) -> bool:
         """Insert a single employee record"""
-        conn = self.get_connection()
+        conn = self._connection()
         cursor = conn.cursor()
         
         try:
@@ -81,38 +533,44 @@ class CompanyDatabase:
             VALUES (?, ?, ?, ?, ?, ?, ?)
             """, (name, age, gender, position, department, work_mode, email))
             
+            # Enroll the new hire in every existing policy that targets them
+            added = self._add_audience_entries(cursor, "e.id = ?", [cursor.lastrowid])
+            
             conn.commit()
-            print(f"✅ Employee '{name}' added successfully.")
+            print(f"✅ Employee '{name}' added successfully ({added} policy acknowledgements pending).")
             return True
             
         except sqlite3.Error as e:
+            conn.rollback()
             print(f"❌ Error inserting employee: {e}")
             return False
-        finally:
-            conn.close()
     
+    @invalidates_cache
     def insert_employees_bulk(self, employees: List[Tuple]):
         """Insert multiple employee records at once"""
-        conn = self.get_connection()
+        conn = self._connection()
         cursor = conn.cursor()
         
         try:
+            last_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM employee").fetchone()[0]
             cursor.executemany("""
             INSERT INTO employee (name, age, gender, position, department, work_mode, email)
             VALUES (?, ?, ?, ?, ?, ?, ?)
             """, employees)
             
+            # Enroll only the rows just inserted in the policies that target them
+            added = self._add_audience_entries(cursor, "e.id > ?", [last_id])
+            
             conn.commit()
-            print(f"✅ {len(employees)} employees added successfully.")
+            print(f"✅ {len(employees)} employees added successfully ({added} policy acknowledgements pending).")
             
         except sqlite3.Error as e:
+            conn.rollback()
             print(f"❌ Error inserting employees: {e}")
-        finally:
-            conn.close()
     
     def get_eligible_employees_for_policy(self, department: str = None, work_mode: str = None) -> List[int]:
         """Get employee IDs that match the policy criteria"""
-        conn = self.get_connection()
+        conn = self._connection()
         cursor = conn.cursor()
         
         try:
@@ -141,12 +599,47 @@ class CompanyDatabase:
         except sqlite3.Error as e:
             print(f"❌ Error getting eligible employees: {e}")
             return []
-        finally:
-            conn.close()
     
+    def _seed_acknowledgements(self, cursor, policy_id: int, department: str = None, work_mode: str = None) -> int:
+        """
+        Create 'not responded' rows for every employee matching the policy criteria
+        with a single INSERT ... SELECT, so employee IDs never pass through Python
+        """
+        conditions = []
+        params = [policy_id]
+        
+        if department:
+            conditions.append("department = ?")
+            params.append(department)
+        
+        if work_mode:
+            conditions.append("work_mode = ?")
+            params.append(work_mode)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor.execute(f"""
+        INSERT OR IGNORE INTO acknowledgements (policy_id, employee_id, status)
+        SELECT ?, id, 'not responded' FROM employee {where}
+        """, params)
+        return cursor.rowcount
+    
+    def _add_audience_entries(self, cursor, employee_filter: str, params: list) -> int:
+        """
+        Create 'not responded' rows pairing the employees selected by `employee_filter`
+        (SQL over alias e) with every policy that targets them; existing rows are kept
+        """
+        cursor.execute(f"""
+        INSERT OR IGNORE INTO acknowledgements (policy_id, employee_id, status)
+        SELECT p.id, e.id, 'not responded'
+        FROM employee e JOIN policies p ON {POLICY_TARGETS_EMPLOYEE}
+        WHERE {employee_filter}
+        """, params)
+        return cursor.rowcount
+    
+    @invalidates_cache
     def create_acknowledgement_entries(self, policy_id: int, employee_ids: List[int]):
         """Create acknowledgement entries for a policy and its eligible employees"""
-        conn = self.get_connection()
+        conn = self._connection()
         cursor = conn.cursor()
         
         try:
@@ -154,7 +647,7 @@ class CompanyDatabase:
             acknowledgement_data = [(policy_id, emp_id, 'not responded') for emp_id in employee_ids]
             
             cursor.executemany("""
-            INSERT INTO acknowledgements (policy_id, employee_id, status)
+            INSERT OR IGNORE INTO acknowledgements (policy_id, employee_id, status)
             VALUES (?, ?, ?)
             """, acknowledgement_data)
             
@@ -162,32 +655,29 @@ class CompanyDatabase:
             print(f"✅ Created {len(employee_ids)} acknowledgement entries for policy ID {policy_id}.")
             
         except sqlite3.Error as e:
+            conn.rollback()
             print(f"❌ Error creating acknowledgement entries: {e}")
-        finally:
-            conn.close()
     
+    @invalidates_cache
     def insert_policy(self, policy_text: str, department: str, work_mode: str, status: str) -> bool:
-        """Insert a single policy record and create acknowledgement entries"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
+        """Insert a single policy record and create acknowledgement entries in one transaction"""
         try:
-            # Insert the policy
-            cursor.execute("""
-            INSERT INTO policies (policy_text, department, work_mode, status)
-            VALUES (?, ?, ?, ?)
-            """, (policy_text, department, work_mode, status))
-            
-            policy_id = cursor.lastrowid
-            conn.commit()
-            
-            # Get eligible employees for this policy
-            eligible_employees = self.get_eligible_employees_for_policy(department, work_mode)
+            with self.transaction() as conn:
+                cursor = conn.cursor()
+                
+                # Insert the policy
+                cursor.execute("""
+                INSERT INTO policies (policy_text, department, work_mode, status)
+                VALUES (?, ?, ?, ?)
+                """, (policy_text, department, work_mode, status))
+                
+                policy_id = cursor.lastrowid
+                
+                # Create acknowledgement entries for eligible employees
+                eligible_count = self._seed_acknowledgements(cursor, policy_id, department, work_mode)
             
-            if eligible_employees:
-                # Create acknowledgement entries
-                self.create_acknowledgement_entries(policy_id, eligible_employees)
-                print(f"✅ Policy added successfully with {len(eligible_employees)} acknowledgement entries.")
+            if eligible_count:
+                print(f"✅ Policy added successfully with {eligible_count} acknowledgement entries.")
             else:
                 print("✅ Policy added successfully (no eligible employees found).")
             
@@ -196,53 +686,663 @@ class CompanyDatabase:
         except sqlite3.Error as e:
             print(f"❌ Error inserting policy: {e}")
             return False
-        finally:
-            conn.close()
     
+    @invalidates_cache
     def insert_policies_bulk(self, policies: List[Tuple]):
-        """Insert multiple policy records at once and create acknowledgement entries"""
-        conn = self.get_connection()
+        """Insert multiple policy records and their acknowledgement entries in one transaction"""
+        try:
+            acknowledgement_count = 0
+            with self.transaction() as conn:
+                cursor = conn.cursor()
+                
+                for policy_data in policies:
+                    policy_text, department, work_mode, status = policy_data
+                    
+                    # Insert the policy
+                    cursor.execute("""
+                    INSERT INTO policies (policy_text, department, work_mode, status)
+                    VALUES (?, ?, ?, ?)
+                    """, (policy_text, department, work_mode, status))
+                    
+                    # Create acknowledgement entries for eligible employees
+                    acknowledgement_count += self._seed_acknowledgements(cursor, cursor.lastrowid, department, work_mode)
+            
+            print(f"✅ {len(policies)} policies added successfully with {acknowledgement_count} acknowledgement entries.")
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error inserting policies: {e}")
+    
+    def enqueue_outbox(self, emails: List[Tuple]) -> int:
+        """
+        Queue (policy_id, employee_id, recipient, subject, body) emails for delivery.
+        Rows that already exist for the same policy and employee are left untouched.
+        """
+        conn = self._connection()
         cursor = conn.cursor()
         
         try:
-            for policy_data in policies:
-                policy_text, department, work_mode, status = policy_data
-                
-                # Insert the policy
-                cursor.execute("""
-                INSERT INTO policies (policy_text, department, work_mode, status)
-                VALUES (?, ?, ?, ?)
-                """, (policy_text, department, work_mode, status))
+            before = conn.total_changes
+            cursor.executemany("""
+            INSERT OR IGNORE INTO outbox (policy_id, employee_id, recipient, subject, body)
+            VALUES (?, ?, ?, ?, ?)
+            """, emails)
+            queued = conn.total_changes - before
+            
+            conn.commit()
+            print(f"✅ Queued {queued} emails ({len(emails) - queued} already in outbox).")
+            return queued
+            
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"❌ Error queueing emails: {e}")
+            return 0
+    
+    def claim_outbox_batch(self, limit: int = 100, policy_id: Optional[int] = None,
+                           worker_id: Optional[str] = None) -> List[Tuple]:
+        """
+        Atomically move up to `limit` due emails from 'pending' to 'sending' and return
+        them as (id, policy_id, employee_id, recipient, subject, body, attempts).
+        With a worker_id only emails in that worker's leased partitions are claimed.
+        """
+        conn = self._connection()
+        cursor = conn.cursor()
+        
+        try:
+            policy_filter = "AND policy_id = ?" if policy_id is not None else ""
+            params = [policy_id] if policy_id is not None else []
+            lease_filter, lease_params = self._lease_filter("employee_id", worker_id)
+            policy_filter += lease_filter
+            params += lease_params
+            cursor.execute(f"""
+            UPDATE outbox
+            SET status = 'sending', attempts = attempts + 1, claimed_by = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id IN (
+                SELECT id FROM outbox
+                WHERE status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP {policy_filter}
+                ORDER BY next_attempt_at, id
+                LIMIT ?
+            )
+            RETURNING id, policy_id, employee_id, recipient, subject, body, attempts
+            """, [worker_id] + params + [limit])
+            batch = cursor.fetchall()
+            conn.commit()
+            return batch
+            
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"❌ Error claiming outbox batch: {e}")
+            return []
+    
+    def mark_outbox_sent(self, outbox_ids: List[int]):
+        """Mark claimed outbox emails as delivered"""
+        conn = self._connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.executemany("""
+            UPDATE outbox SET status = 'sent', last_error = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+            """, [(outbox_id,) for outbox_id in outbox_ids])
+            conn.commit()
+            
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"❌ Error marking outbox emails as sent: {e}")
+    
+    def mark_outbox_failed(self, failures: List[Tuple]):
+        """
+        Record failed deliveries given as (outbox_id, error, retry_delay_seconds).
+        A retry delay of None gives up on the email and marks it 'failed'.
+        """
+        conn = self._connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.executemany("""
+            UPDATE outbox
+            SET status = CASE WHEN ?3 IS NULL THEN 'failed' ELSE 'pending' END,
+                last_error = ?2,
+                next_attempt_at = datetime('now', '+' || COALESCE(?3, 0) || ' seconds'),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?1
+            """, failures)
+            conn.commit()
+            
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"❌ Error marking outbox emails as failed: {e}")
+    
+    def requeue_stale_outbox(self, older_than_seconds: int = 600) -> int:
+        """
+        Put emails stuck in 'sending' (e.g. after a worker crash) back into 'pending'.
+        Emails claimed by a sharded worker are requeued once that worker stops heartbeating,
+        never while it is still alive; unsharded claims after `older_than_seconds`.
+        """
+        conn = self._connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+            UPDATE outbox SET status = 'pending', claimed_by = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'sending'
+              AND CASE WHEN claimed_by IS NULL THEN updated_at <= datetime('now', ?)
+                       ELSE claimed_by NOT IN (SELECT worker_id FROM lease_workers
+                                               WHERE expires_at > CURRENT_TIMESTAMP) END
+            """, (f"-{int(older_than_seconds)} seconds",))
+            requeued = cursor.rowcount
+            conn.commit()
+            if requeued:
+                print(f"✅ Requeued {requeued} stale outbox emails.")
+            return requeued
+            
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"❌ Error requeueing stale outbox emails: {e}")
+            return 0
+    
+    def get_outbox_counts(self, policy_id: int) -> dict:
+        """Count a policy's outbox emails by delivery status"""
+        conn = self._connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+            SELECT status, COUNT(*) FROM outbox WHERE policy_id = ? GROUP BY status
+            """, (policy_id,))
+            counts = {'pending': 0, 'sending': 0, 'sent': 0, 'failed': 0}
+            counts.update(dict(cursor.fetchall()))
+            return counts
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error counting outbox emails: {e}")
+            return {}
+    
+    def create_job(self, policy_id: int) -> Optional[int]:
+        """Record a queued background job for a policy and return its ID"""
+        conn = self._connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("INSERT INTO jobs (policy_id, stage) VALUES (?, 'queued')", (policy_id,))
+            job_id = cursor.lastrowid
+            conn.commit()
+            return job_id
+            
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"❌ Error creating job: {e}")
+            return None
+    
+    def update_job(self, job_id: int, **kwargs) -> bool:
+        """Update job progress fields by ID"""
+        conn = self._connection()
+        cursor = conn.cursor()
+        
+        valid_fields = ['status', 'stage', 'total', 'message']
+        updates = []
+        values = []
+        
+        for field, value in kwargs.items():
+            if field in valid_fields:
+                updates.append(f"{field} = ?")
+                values.append(value)
+        
+        if not updates:
+            print("❌ No valid fields provided for update.")
+            return False
+        
+        values.append(job_id)
+        
+        try:
+            cursor.execute(f"UPDATE jobs SET {', '.join(updates)}, updated_at = CURRENT_TIMESTAMP WHERE id = ?", values)
+            conn.commit()
+            return cursor.rowcount > 0
+            
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"❌ Error updating job: {e}")
+            return False
+    
+    def fail_interrupted_jobs(self) -> int:
+        """Mark jobs left queued or running by a previous process as failed"""
+        conn = self._connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+            UPDATE jobs SET status = 'failed', message = 'Interrupted by restart', updated_at = CURRENT_TIMESTAMP
+            WHERE status IN ('queued', 'running')
+            """)
+            conn.commit()
+            return cursor.rowcount
+            
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"❌ Error failing interrupted jobs: {e}")
+            return 0
+    
+    def get_job_status(self, job_id: int) -> Optional[dict]:
+        """Return a job's state together with live sent/failed/pending counts from the outbox"""
+        conn = self._connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+            SELECT j.id, j.policy_id, j.status, j.stage, j.total, j.message,
+                   COALESCE(SUM(o.status = 'sent'), 0),
+                   COALESCE(SUM(o.status = 'failed'), 0),
+                   COALESCE(SUM(o.status IN ('pending', 'sending')), 0)
+            FROM jobs j
+            LEFT JOIN outbox o ON o.policy_id = j.policy_id
+            WHERE j.id = ?
+            GROUP BY j.id
+            """, (job_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            
+            keys = ['id', 'policy_id', 'status', 'stage', 'total', 'message', 'sent', 'failed', 'pending']
+            return dict(zip(keys, row))
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error getting job status: {e}")
+            return None
+    
+    def _lease_filter(self, column: str, worker_id: Optional[str]) -> Tuple[str, list]:
+        """AND-clause and params limiting `column` (an employee ID) to the worker's leased partitions"""
+        if worker_id is None:
+            return "", []
+        return f"AND {LEASED_BY_WORKER.format(column=column, partitions=LEASE_PARTITIONS)}", [worker_id]
+    
+    def acquire_partitions(self, worker_id: str, ttl_seconds: int = 60) -> List[int]:
+        """
+        Renew this worker's partition leases and rebalance: take free or expired partitions
+        up to an equal share among live workers, hand back any above it. Returns the partitions held.
+        """
+        expires = f"+{int(ttl_seconds)} seconds"
+        try:
+            with self.transaction() as conn:
+                conn.executemany("INSERT OR IGNORE INTO worker_leases (partition) VALUES (?)",
+                                 [(partition,) for partition in range(LEASE_PARTITIONS)])
+                conn.execute("DELETE FROM lease_workers WHERE expires_at <= CURRENT_TIMESTAMP")
+                conn.execute("""
+                INSERT OR REPLACE INTO lease_workers (worker_id, expires_at) VALUES (?, datetime('now', ?))
+                """, (worker_id, expires))
+                conn.execute("""
+                UPDATE worker_leases SET lease_expires_at = datetime('now', ?) WHERE worker_id = ?
+                """, (expires, worker_id))
                 
-                policy_id = cursor.lastrowid
+                others = conn.execute("SELECT COUNT(*) FROM lease_workers WHERE worker_id != ?",
+                                      (worker_id,)).fetchone()[0]
+                share = -(-LEASE_PARTITIONS // (others + 1))
+                held = conn.execute("SELECT COUNT(*) FROM worker_leases WHERE worker_id = ?",
+                                    (worker_id,)).fetchone()[0]
                 
-                # Get eligible employees for this policy
-                eligible_employees = self.get_eligible_employees_for_policy(department, work_mode)
+                if held < share:
+                    conn.execute("""
+                    UPDATE worker_leases SET worker_id = ?, lease_expires_at = datetime('now', ?)
+                    WHERE partition IN (
+                        SELECT partition FROM worker_leases
+                        WHERE worker_id IS NULL OR lease_expires_at <= CURRENT_TIMESTAMP
+                        ORDER BY partition
+                        LIMIT ?
+                    )
+                    """, (worker_id, expires, share - held))
+                elif held > share:
+                    conn.execute("""
+                    UPDATE worker_leases SET worker_id = NULL, lease_expires_at = NULL
+                    WHERE partition IN (
+                        SELECT partition FROM worker_leases WHERE worker_id = ?
+                        ORDER BY partition DESC
+                        LIMIT ?
+                    )
+                    """, (worker_id, held - share))
                 
-                if eligible_employees:
-                    # Create acknowledgement entries
-                    acknowledgement_data = [(policy_id, emp_id, 'not responded') for emp_id in eligible_employees]
-                    cursor.executemany("""
-                    INSERT INTO acknowledgements (policy_id, employee_id, status)
-                    VALUES (?, ?, ?)
-                    """, acknowledgement_data)
+                return [row[0] for row in conn.execute(
+                    "SELECT partition FROM worker_leases WHERE worker_id = ? ORDER BY partition", (worker_id,))]
             
+        except sqlite3.Error as e:
+            print(f"❌ Error acquiring partition leases: {e}")
+            return []
+    
+    def release_partitions(self, worker_id: str) -> int:
+        """Give up all of a worker's partition leases (on clean shutdown)"""
+        conn = self._connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+            UPDATE worker_leases SET worker_id = NULL, lease_expires_at = NULL WHERE worker_id = ?
+            """, (worker_id,))
+            released = cursor.rowcount
+            cursor.execute("DELETE FROM lease_workers WHERE worker_id = ?", (worker_id,))
             conn.commit()
-            print(f"✅ {len(policies)} policies added successfully with acknowledgement entries.")
+            return released
             
         except sqlite3.Error as e:
-            print(f"❌ Error inserting policies: {e}")
+            conn.rollback()
+            print(f"❌ Error releasing partition leases: {e}")
+            return 0
+    
+    def get_mailbox_state(self, mailbox: str) -> Optional[Tuple[int, int]]:
+        """(uid_validity, last_uid) the reply scanner reached in a mailbox, or None if never scanned"""
+        conn = self._connection()
+        
+        try:
+            row = conn.execute("SELECT uid_validity, last_uid FROM imap_sync_state WHERE mailbox = ?",
+                               (mailbox,)).fetchone()
+            return tuple(row) if row else None
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error reading mailbox state: {e}")
+            return None
+    
+    def save_mailbox_state(self, mailbox: str, uid_validity: int, last_uid: int) -> bool:
+        """Record how far the reply scanner got in a mailbox"""
+        conn = self._connection()
+        
+        try:
+            conn.execute("""
+            INSERT INTO imap_sync_state (mailbox, uid_validity, last_uid, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(mailbox) DO UPDATE SET
+                uid_validity = excluded.uid_validity,
+                last_uid = excluded.last_uid,
+                updated_at = excluded.updated_at
+            """, (mailbox, uid_validity, last_uid))
+            conn.commit()
+            return True
+            
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"❌ Error saving mailbox state: {e}")
+            return False
+    
+    def schedule_reminders(self, policy_id: int, first_delay_days: int, after_id: int = 0,
+                           worker_id: Optional[str] = None) -> int:
+        """
+        Start reminders for everyone who has not responded to a policy; the first one is
+        due `first_delay_days` from now. Already scheduled acknowledgements are left alone,
+        so this also picks up employees enrolled after the rollout. With `after_id` only
+        acknowledgements with a higher id are looked at, and with worker_id only employees
+        in the worker's leased partitions.
+        """
+        conn = self._connection()
+        cursor = conn.cursor()
+        lease_filter, params = self._lease_filter("employee_id", worker_id)
+        
+        try:
+            cursor.execute(f"""
+            INSERT OR IGNORE INTO reminders (acknowledgement_id, policy_id, employee_id, next_due_at)
+            SELECT id, policy_id, employee_id, datetime('now', '+' || ? || ' days')
+            FROM acknowledgements
+            WHERE status = 'not responded' AND policy_id = ? AND id > ? {lease_filter}
+            """, [int(first_delay_days), policy_id, after_id] + params)
+            scheduled = cursor.rowcount
+            conn.commit()
+            if scheduled:
+                print(f"✅ Scheduled reminders for {scheduled} employees on policy ID {policy_id}.")
+            return scheduled
+            
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"❌ Error scheduling reminders: {e}")
+            return 0
+    
+    def get_implemented_policies(self) -> List[Tuple[int, Optional[str]]]:
+        """(policy_id, reminder_days) for every implemented policy"""
+        conn = self._connection()
+        
+        try:
+            return conn.execute("""
+            SELECT id, reminder_days FROM policies WHERE status = 'Implemented' ORDER BY id
+            """).fetchall()
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error reading implemented policies: {e}")
+            return []
+    
+    def get_last_acknowledgement_id(self) -> int:
+        """Highest acknowledgement id so far, 0 when there are none"""
+        conn = self._connection()
+        
+        try:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM acknowledgements").fetchone()[0]
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error reading last acknowledgement id: {e}")
+            return 0
+    
+    def get_reminder_queue(self, worker_id: Optional[str] = None) -> List[Tuple[int, str, Optional[str]]]:
+        """
+        (policy_id, earliest next_due_at, reminder_days) for every policy with reminders left to send,
+        limited to the worker's leased partitions when worker_id is given. Each policy's earliest
+        reminder is one probe of idx_reminders_policy_due rather than a scan of all reminders.
+        """
+        conn = self._connection()
+        lease_filter, params = self._lease_filter("r.employee_id", worker_id)
+        
+        try:
+            return conn.execute(f"""
+            SELECT policy_id, next_due_at, reminder_days FROM (
+                SELECT p.id AS policy_id, p.reminder_days,
+                       (SELECT r.next_due_at FROM reminders r
+                        WHERE r.policy_id = p.id AND r.next_due_at IS NOT NULL {lease_filter}
+                        ORDER BY r.next_due_at LIMIT 1) AS next_due_at
+                FROM policies p
+            )
+            WHERE next_due_at IS NOT NULL
+            """, params).fetchall()
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error reading reminder queue: {e}")
+            return []
+    
+    def claim_reminders(self, acknowledgement_ids: List[int], worker_id: Optional[str] = None,
+                        claim_seconds: int = 900) -> List[int]:
+        """
+        Claim due reminders before sending them by moving next_due_at `claim_seconds` ahead;
+        returns the IDs claimed. Ones another worker claimed first, no longer due or outside the
+        worker's leased partitions are skipped. If the sender dies the claim lapses and they come
+        due again; advance_reminders / retry_reminders replace it once the send is recorded.
+        """
+        if not acknowledgement_ids:
+            return []
+        lease_filter, params = self._lease_filter("employee_id", worker_id)
+        placeholders = ", ".join("?" * len(acknowledgement_ids))
+        
+        try:
+            with self.transaction() as conn:
+                return [row[0] for row in conn.execute(f"""
+                UPDATE reminders SET next_due_at = datetime('now', ?)
+                WHERE acknowledgement_id IN ({placeholders})
+                  AND next_due_at <= CURRENT_TIMESTAMP {lease_filter}
+                RETURNING acknowledgement_id
+                """, [f"+{int(claim_seconds)} seconds"] + list(acknowledgement_ids) + params).fetchall()]
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error claiming reminders: {e}")
+            return []
+    
+    def get_next_reminder_due(self, policy_id: int, worker_id: Optional[str] = None) -> Optional[str]:
+        """When the policy's next reminder is due, or None once all have been sent"""
+        conn = self._connection()
+        lease_filter, params = self._lease_filter("employee_id", worker_id)
+        
+        try:
+            return conn.execute(f"""
+            SELECT MIN(next_due_at) FROM reminders
+            WHERE policy_id = ? AND next_due_at IS NOT NULL {lease_filter}
+            """, [policy_id] + params).fetchone()[0]
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error reading next reminder time: {e}")
+            return None
+    
+    def _stream(self, query: str, params: tuple, chunk_size: int) -> Iterator[List[Tuple]]:
+        """
+        Yield a query's rows in chunks of `chunk_size` from a dedicated connection, so the
+        caller can write through this thread's connection while the read is still open
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.execute(query, params)
+            while True:
+                chunk = cursor.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
         finally:
             conn.close()
     
+    def iter_due_reminders(self, policy_id: int, chunk_size: int = 100,
+                           worker_id: Optional[str] = None) -> Iterator[List[Tuple]]:
+        """
+        Stream a policy's due reminders in chunks of
+        (acknowledgement_id, employee_id, employee_email, employee_name, reminders_sent).
+        Only acknowledgements still 'not responded' are returned.
+        """
+        lease_filter, params = self._lease_filter("r.employee_id", worker_id)
+        try:
+            yield from self._stream(f"""
+            SELECT r.acknowledgement_id, r.employee_id, e.email, e.name, r.reminders_sent
+            FROM reminders r
+            JOIN acknowledgements a ON a.id = r.acknowledgement_id
+            JOIN employee e ON e.id = r.employee_id
+            WHERE r.policy_id = ? AND r.next_due_at <= CURRENT_TIMESTAMP AND a.status = 'not responded'
+            {lease_filter}
+            ORDER BY r.next_due_at
+            """, tuple([policy_id] + params), chunk_size)
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error reading due reminders: {e}")
+    
+    def iter_due_reminder_digests(self, chunk_size: int = 100,
+                                  worker_id: Optional[str] = None) -> Iterator[List[Tuple]]:
+        """
+        Stream employees with at least one reminder due, oldest due first, in chunks of
+        (employee_id, employee_email, employee_name, reminders) where reminders is a JSON array
+        of every reminder the employee still has scheduled (acknowledgement_id, policy_id,
+        policy_text, reminders_sent, reminder_days, due). Ones not yet due are listed too but
+        flagged due = 0, so they can be mentioned without advancing their cadence. Answered
+        acknowledgements need no check here: trg_reminders_responded deletes their reminders.
+        """
+        lease_filter, params = self._lease_filter("employee_id", worker_id)
+        conn = self.get_connection()
+        try:
+            # Due employees come straight off idx_reminders_due in due order, so nothing is sorted
+            # or grouped beyond the chunk being built
+            due = conn.execute(f"""
+            SELECT employee_id FROM reminders
+            WHERE next_due_at <= CURRENT_TIMESTAMP {lease_filter}
+            ORDER BY next_due_at
+            """, params)
+            seen = set()
+            batch = []
+            for (employee_id,) in due:
+                if employee_id in seen:
+                    continue
+                seen.add(employee_id)
+                batch.append(employee_id)
+                if len(batch) == chunk_size:
+                    yield self._reminder_digests(conn, batch)
+                    batch = []
+            if batch:
+                yield self._reminder_digests(conn, batch)
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error reading due reminder digests: {e}")
+        finally:
+            conn.close()
+    
+    def _reminder_digests(self, conn: sqlite3.Connection, employee_ids: List[int]) -> List[Tuple]:
+        """Digest rows for the given employees, in the order given"""
+        placeholders = ", ".join("?" * len(employee_ids))
+        # CROSS JOIN keeps the planner on the employee ids: each one probes idx_reminders_employee
+        rows = conn.execute(f"""
+        SELECT e.id, e.email, e.name,
+               json_group_array(json_object(
+                   'acknowledgement_id', r.acknowledgement_id,
+                   'policy_id', r.policy_id,
+                   'policy_text', p.policy_text,
+                   'reminders_sent', r.reminders_sent,
+                   'reminder_days', p.reminder_days,
+                   'due', r.next_due_at <= CURRENT_TIMESTAMP
+               ))
+        FROM employee e
+        CROSS JOIN reminders r
+        CROSS JOIN policies p
+        WHERE e.id IN ({placeholders})
+          AND r.employee_id = e.id AND r.next_due_at IS NOT NULL
+          AND p.id = r.policy_id
+        GROUP BY e.id
+        """, employee_ids).fetchall()
+        by_employee = {row[0]: row for row in rows}
+        return [by_employee[employee_id] for employee_id in employee_ids if employee_id in by_employee]
+    
+    def get_next_digest_due(self, worker_id: Optional[str] = None) -> Optional[str]:
+        """When the next reminder of any policy is due, or None if there are none left"""
+        conn = self._connection()
+        lease_filter, params = self._lease_filter("employee_id", worker_id)
+        
+        try:
+            return conn.execute(f"""
+            SELECT MIN(next_due_at) FROM reminders WHERE next_due_at IS NOT NULL {lease_filter}
+            """, params).fetchone()[0]
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error reading next reminder time: {e}")
+            return None
+    
+    def advance_reminders(self, sent: List[Tuple[int, Optional[int]]]):
+        """
+        Record sent reminders given as (acknowledgement_id, next_reminder_day). The next one is
+        due that many days after scheduling but never less than a day from now; None ends them.
+        """
+        conn = self._connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.executemany("""
+            UPDATE reminders
+            SET reminders_sent = reminders_sent + 1,
+                last_sent_at = CURRENT_TIMESTAMP,
+                last_error = NULL,
+                next_due_at = CASE WHEN ?2 IS NULL THEN NULL
+                              ELSE MAX(datetime(scheduled_at, '+' || ?2 || ' days'), datetime('now', '+1 days')) END
+            WHERE acknowledgement_id = ?1
+            """, sent)
+            conn.commit()
+            
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"❌ Error recording sent reminders: {e}")
+    
+    def retry_reminders(self, failures: List[Tuple[int, str, int]]):
+        """Push failed reminders given as (acknowledgement_id, error, retry_delay_seconds) back"""
+        conn = self._connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.executemany("""
+            UPDATE reminders
+            SET last_error = ?2, next_due_at = datetime('now', '+' || ?3 || ' seconds')
+            WHERE acknowledgement_id = ?1
+            """, failures)
+            conn.commit()
+            
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"❌ Error recording failed reminders: {e}")
+    
+    @invalidates_cache
     def update_acknowledgement_status(self, policy_id: int, employee_id: int, status: str) -> bool:
         """Update acknowledgement status for a specific policy-employee combination"""
-        conn = self.get_connection()
+        conn = self._connection()
         cursor = conn.cursor()
         
         if status not in ['ack', 'nak', 'not responded']:
             print("❌ Invalid status. Must be 'ack', 'nak', or 'not responded'.")
-            conn.close()
             return False
         
         try:
@@ -257,18 +1357,53 @@ class CompanyDatabase:
                 print(f"✅ Acknowledgement status updated to '{status}' for policy ID {policy_id}, employee ID {employee_id}.")
                 return True
             else:
+                conn.rollback()
                 print(f"❌ No acknowledgement entry found for policy ID {policy_id}, employee ID {employee_id}.")
                 return False
                 
         except sqlite3.Error as e:
+            conn.rollback()
             print(f"❌ Error updating acknowledgement status: {e}")
             return False
-        finally:
-            conn.close()
     
+    @invalidates_cache
+    def update_acknowledgement_statuses(self, updates: List[Tuple[int, int, str]]) -> List[bool]:
+        """
+        Apply many (policy_id, employee_id, status) updates in one transaction.
+        Returns, per update, whether an acknowledgement entry was found and changed.
+        """
+        if not updates:
+            return []
+        
+        conn = self._connection()
+        cursor = conn.cursor()
+        
+        try:
+            results = []
+            for policy_id, employee_id, status in updates:
+                if status not in ['ack', 'nak', 'not responded']:
+                    results.append(False)
+                    continue
+                cursor.execute("""
+                UPDATE acknowledgements 
+                SET status = ?, updated_at = CURRENT_TIMESTAMP 
+                WHERE policy_id = ? AND employee_id = ?
+                """, (status, policy_id, employee_id))
+                results.append(cursor.rowcount > 0)
+            
+            conn.commit()
+            print(f"✅ {sum(results)}/{len(updates)} acknowledgement statuses updated in one batch.")
+            return results
+            
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"❌ Error updating acknowledgement statuses: {e}")
+            return [False] * len(updates)
+    
+    @invalidates_cache
     def update_employee(self, employee_id: int, **kwargs) -> bool:
         """Update employee data by ID"""
-        conn = self.get_connection()
+        conn = self._connection()
         cursor = conn.cursor()
         
         # Build dynamic update query
@@ -283,7 +1418,6 @@ class CompanyDatabase:
         
         if not updates:
             print("❌ No valid fields provided for update.")
-            conn.close()
             return False
         
         values.append(employee_id)  # Add ID for WHERE clause
@@ -293,26 +1427,47 @@ class CompanyDatabase:
             cursor.execute(query, values)
             
             if cursor.rowcount > 0:
+                if 'department' in kwargs or 'work_mode' in kwargs:
+                    # Moved: retire unanswered policies that no longer apply, enroll in new ones
+                    cursor.execute(f"""
+                    DELETE FROM acknowledgements
+                    WHERE employee_id = ? AND status = 'not responded' AND policy_id IN (
+                        SELECT p.id FROM policies p JOIN employee e ON e.id = ?
+                        WHERE NOT ({POLICY_TARGETS_EMPLOYEE})
+                    )
+                    """, (employee_id, employee_id))
+                    retired = cursor.rowcount
+                    # Their queued emails for those policies would link to acknowledgements that are gone
+                    cursor.execute("""
+                    DELETE FROM outbox
+                    WHERE employee_id = ? AND status = 'pending' AND policy_id NOT IN (
+                        SELECT policy_id FROM acknowledgements WHERE employee_id = ?
+                    )
+                    """, (employee_id, employee_id))
+                    added = self._add_audience_entries(cursor, "e.id = ?", [employee_id])
+                    print(f"✅ Employee ID {employee_id} audiences updated (+{added} / -{retired} acknowledgements).")
+                
                 conn.commit()
                 print(f"✅ Employee ID {employee_id} updated successfully.")
                 return True
             else:
+                conn.rollback()
                 print(f"❌ No employee found with ID {employee_id}.")
                 return False
                 
         except sqlite3.Error as e:
+            conn.rollback()
             print(f"❌ Error updating employee: {e}")
             return False
-        finally:
-            conn.close()
     
+    @invalidates_cache
     def update_policy(self, policy_id: int, **kwargs) -> bool:
         """Update policy data by ID"""
-        conn = self.get_connection()
+        conn = self._connection()
         cursor = conn.cursor()
         
         # Build dynamic update query
-        valid_fields = ['policy_text', 'department', 'work_mode', 'status']
+        valid_fields = ['policy_text', 'department', 'work_mode', 'status', 'reminder_days']
         updates = []
         values = []
         
@@ -323,7 +1478,6 @@ class CompanyDatabase:
         
         if not updates:
             print("❌ No valid fields provided for update.")
-            conn.close()
             return False
         
         values.append(policy_id)  # Add ID for WHERE clause
@@ -337,21 +1491,24 @@ class CompanyDatabase:
                 print(f"✅ Policy ID {policy_id} updated successfully.")
                 return True
             else:
+                conn.rollback()
                 print(f"❌ No policy found with ID {policy_id}.")
                 return False
                 
         except sqlite3.Error as e:
+            conn.rollback()
             print(f"❌ Error updating policy: {e}")
             return False
-        finally:
-            conn.close()
     
+    @invalidates_cache
     def delete_employee(self, employee_id: int) -> bool:
-        """Delete an employee by ID"""
-        conn = self.get_connection()
+        """Delete an employee by ID, along with their acknowledgements and any emails not yet sent"""
+        conn = self._connection()
         cursor = conn.cursor()
         
         try:
+            cursor.execute("DELETE FROM outbox WHERE employee_id = ? AND status = 'pending'", (employee_id,))
+            cursor.execute("DELETE FROM acknowledgements WHERE employee_id = ?", (employee_id,))
             cursor.execute("DELETE FROM employee WHERE id = ?", (employee_id,))
             
             if cursor.rowcount > 0:
@@ -359,21 +1516,26 @@ class CompanyDatabase:
                 print(f"✅ Employee ID {employee_id} deleted successfully.")
                 return True
             else:
+                conn.rollback()
                 print(f"❌ No employee found with ID {employee_id}.")
                 return False
                 
         except sqlite3.Error as e:
+            conn.rollback()
             print(f"❌ Error deleting employee: {e}")
             return False
-        finally:
-            conn.close()
     
+    @invalidates_cache
     def delete_policy(self, policy_id: int) -> bool:
-        """Delete a policy by ID"""
-        conn = self.get_connection()
+        """Delete a policy by ID, along with its acknowledgements and any emails not yet sent"""
+        conn = self._connection()
         cursor = conn.cursor()
         
         try:
+            # Foreign keys are not enforced, so nothing cascades; without this a rollout in
+            # progress keeps delivering links for a policy that no longer exists
+            cursor.execute("DELETE FROM outbox WHERE policy_id = ? AND status = 'pending'", (policy_id,))
+            cursor.execute("DELETE FROM acknowledgements WHERE policy_id = ?", (policy_id,))
             cursor.execute("DELETE FROM policies WHERE id = ?", (policy_id,))
             
             if cursor.rowcount > 0:
@@ -381,21 +1543,30 @@ class CompanyDatabase:
                 print(f"✅ Policy ID {policy_id} deleted successfully.")
                 return True
             else:
+                conn.rollback()
                 print(f"❌ No policy found with ID {policy_id}.")
                 return False
                 
         except sqlite3.Error as e:
+            conn.rollback()
             print(f"❌ Error deleting policy: {e}")
             return False
-        finally:
-            conn.close()
     
+    @invalidates_cache
     def delete_employees_by_department(self, department: str) -> int:
         """Delete all employees from a specific department"""
-        conn = self.get_connection()
+        conn = self._connection()
         cursor = conn.cursor()
         
         try:
+            cursor.execute("""
+            DELETE FROM outbox
+            WHERE status = 'pending' AND employee_id IN (SELECT id FROM employee WHERE department = ?)
+            """, (department,))
+            cursor.execute("""
+            DELETE FROM acknowledgements
+            WHERE employee_id IN (SELECT id FROM employee WHERE department = ?)
+            """, (department,))
             cursor.execute("DELETE FROM employee WHERE department = ?", (department,))
             deleted_count = cursor.rowcount
             conn.commit()
@@ -403,14 +1574,13 @@ class CompanyDatabase:
             return deleted_count
             
         except sqlite3.Error as e:
+            conn.rollback()
             print(f"❌ Error deleting employees: {e}")
             return 0
-        finally:
-            conn.close()
     
     def view_employees(self) -> pd.DataFrame:
         """View all employees"""
-        conn = self.get_connection()
+        conn = self._connection()
         
         try:
             df = pd.read_sql_query("SELECT * FROM employee", conn)
@@ -421,12 +1591,11 @@ class CompanyDatabase:
         except sqlite3.Error as e:
             print(f"❌ Error reading employees: {e}")
             return pd.DataFrame()
-        finally:
-            conn.close()
     
+    @cached_read
     def view_policies(self) -> pd.DataFrame:
         """View all policies"""
-        conn = self.get_connection()
+        conn = self._connection()
         
         try:
             df = pd.read_sql_query("SELECT * FROM policies", conn)
@@ -437,12 +1606,122 @@ class CompanyDatabase:
         except sqlite3.Error as e:
             print(f"❌ Error reading policies: {e}")
             return pd.DataFrame()
-        finally:
-            conn.close()
+    
+    def _policy_filter_clause(self, filters: Optional[dict]) -> Tuple[List[str], list]:
+        """WHERE conditions and parameters for list_policies/count_policies filters"""
+        conditions = []
+        params = []
+        
+        for field, value in (filters or {}).items():
+            if value is None or value == '':
+                continue
+            if field in ['status', 'department', 'work_mode']:
+                conditions.append(f"{field} = ?")
+                params.append(value)
+            elif field == 'search':
+                conditions.append("policy_text LIKE ?")
+                params.append(f"%{value.strip()}%")
+            elif field == 'exclude_ids' and value:
+                conditions.append(f"id NOT IN ({', '.join('?' * len(value))})")
+                params.extend(int(policy_id) for policy_id in value)
+        
+        return conditions, params
+    
+    @cached_read
+    def list_policies(self, cursor: Optional[int] = None, limit: Optional[int] = 25,
+                      filters: Optional[dict] = None) -> pd.DataFrame:
+        """
+        One page of policies ordered by ID, starting after the `cursor` policy ID.
+        filters may hold status, department, work_mode, search (policy text) and exclude_ids.
+        A limit of None returns every matching policy.
+        """
+        conn = self._connection()
+        
+        conditions, params = self._policy_filter_clause(filters)
+        if cursor is not None:
+            conditions.append("id > ?")
+            params.append(int(cursor))
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT ?"
+            params.append(limit)
+        
+        try:
+            query = f"SELECT * FROM policies {where} ORDER BY id {limit_clause}"
+            return pd.read_sql_query(query, conn, params=params)
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error listing policies: {e}")
+            return pd.DataFrame()
+    
+    @cached_read
+    def count_policies(self, filters: Optional[dict] = None) -> int:
+        """Number of policies matching the same filters as list_policies"""
+        conn = self._connection()
+        
+        conditions, params = self._policy_filter_clause(filters)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM policies {where}", params).fetchone()[0]
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error counting policies: {e}")
+            return 0
+    
+    @cached_read
+    def get_policy_status_totals(self) -> List[Tuple[str, int]]:
+        """(status, policy count) for every policy status"""
+        conn = self._connection()
+        
+        try:
+            return conn.execute(
+                "SELECT status, COUNT(*) FROM policies GROUP BY status ORDER BY status"
+            ).fetchall()
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error counting policies by status: {e}")
+            return []
+    
+    @cached_read
+    def get_department_status_matrix(self) -> List[Tuple[str, str, int]]:
+        """(department, status, policy count) for every department and status that has policies"""
+        conn = self._connection()
+        
+        try:
+            return conn.execute("""
+            SELECT department, status, COUNT(*)
+            FROM policies
+            WHERE department IS NOT NULL
+            GROUP BY department, status
+            ORDER BY department, status
+            """).fetchall()
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error counting policies by department: {e}")
+            return []
+    
+    @cached_read
+    def get_implementation_rate(self) -> Tuple[int, int, float]:
+        """(implemented, total, implementation rate in percent) across all policies"""
+        conn = self._connection()
+        
+        try:
+            implemented, total = conn.execute("""
+            SELECT COALESCE(SUM(status = 'Implemented'), 0), COUNT(*)
+            FROM policies
+            """).fetchone()
+            return implemented, total, (implemented / total * 100) if total else 0.0
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error computing implementation rate: {e}")
+            return 0, 0, 0.0
     
     def view_acknowledgements(self) -> pd.DataFrame:
         """View all acknowledgements with employee and policy details"""
-        conn = self.get_connection()
+        conn = self._connection()
         
         try:
             query = """
@@ -471,25 +1750,58 @@ class CompanyDatabase:
         except sqlite3.Error as e:
             print(f"❌ Error reading acknowledgements: {e}")
             return pd.DataFrame()
-        finally:
-            conn.close()
     
+    @cached_read
+    def get_policy_ack_counts(self, policy_id: int) -> dict:
+        """Acknowledgement counts for one policy, read from the maintained counters"""
+        conn = self._connection()
+        
+        try:
+            row = conn.execute("""
+            SELECT ack_count, nak_count, not_responded_count FROM policy_ack_counts WHERE policy_id = ?
+            """, (policy_id,)).fetchone()
+            ack, nak, not_responded = row if row else (0, 0, 0)
+            return {'ack': ack, 'nak': nak, 'not responded': not_responded, 'total': ack + nak + not_responded}
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error getting acknowledgement counts: {e}")
+            return {'ack': 0, 'nak': 0, 'not responded': 0, 'total': 0}
+    
+    @cached_read
+    def get_acknowledgement_totals(self) -> dict:
+        """Acknowledgement counts by status across all policies (one counter row per policy)"""
+        conn = self._connection()
+        
+        try:
+            ack, nak, not_responded = conn.execute("""
+            SELECT COALESCE(SUM(ack_count), 0), COALESCE(SUM(nak_count), 0), COALESCE(SUM(not_responded_count), 0)
+            FROM policy_ack_counts
+            """).fetchone()
+            return {'ack': ack, 'nak': nak, 'not responded': not_responded}
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error getting acknowledgement totals: {e}")
+            return {}
+    
+    @cached_read
     def get_policy_acknowledgement_summary(self, policy_id: int) -> pd.DataFrame:
         """Get acknowledgement summary for a specific policy"""
-        conn = self.get_connection()
+        conn = self._connection()
         
         try:
             query = """
-            SELECT 
-                p.policy_text,
-                a.status,
-                COUNT(*) as count
-            FROM acknowledgements a
-            JOIN policies p ON a.policy_id = p.id
-            WHERE a.policy_id = ?
-            GROUP BY a.status
+            SELECT p.policy_text, s.status, s.count
+            FROM (
+                SELECT policy_id, 'ack' AS status, ack_count AS count FROM policy_ack_counts WHERE policy_id = ?
+                UNION ALL
+                SELECT policy_id, 'nak', nak_count FROM policy_ack_counts WHERE policy_id = ?
+                UNION ALL
+                SELECT policy_id, 'not responded', not_responded_count FROM policy_ack_counts WHERE policy_id = ?
+            ) s
+            JOIN policies p ON p.id = s.policy_id
+            WHERE s.count > 0
             """
-            df = pd.read_sql_query(query, conn, params=[policy_id])
+            df = pd.read_sql_query(query, conn, params=[policy_id] * 3)
             print(f"📊 Acknowledgement Summary for Policy ID {policy_id}:")
             print(df)
             return df
@@ -497,12 +1809,60 @@ class CompanyDatabase:
         except sqlite3.Error as e:
             print(f"❌ Error getting policy acknowledgement summary: {e}")
             return pd.DataFrame()
-        finally:
-            conn.close()
+    
+    @cached_read
+    def list_policy_recipients(self, policy_id: int, after: Optional[Tuple[str, int]] = None, limit: int = 50,
+                               status: Optional[str] = None, email_search: Optional[str] = None) -> pd.DataFrame:
+        """
+        One page of a policy's recipients ordered by (name, id).
+        Pass the (employee_name, employee_id) of the previous page's last row as `after`
+        to get the next page; the cost depends on the page size, not the policy size.
+        """
+        conn = self._connection()
+        
+        conditions = ["a.policy_id = ?"]
+        params = [policy_id]
+        
+        if after:
+            conditions.append("(e.name, e.id) > (?, ?)")
+            params.extend(after)
+        
+        if status:
+            conditions.append("a.status = ?")
+            params.append(status)
+        
+        if email_search:
+            conditions.append("e.email LIKE ?")
+            params.append(f"%{email_search.strip()}%")
+        
+        params.append(limit)
+        
+        try:
+            query = f"""
+            SELECT 
+                e.id as employee_id,
+                e.name as employee_name,
+                e.email as employee_email,
+                e.department,
+                e.work_mode,
+                a.status,
+                a.updated_at,
+                a.created_at
+            FROM acknowledgements a
+            JOIN employee e ON a.employee_id = e.id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY e.name, e.id
+            LIMIT ?
+            """
+            return pd.read_sql_query(query, conn, params=params)
+            
+        except sqlite3.Error as e:
+            print(f"❌ Error listing policy recipients: {e}")
+            return pd.DataFrame()
     
     def search_employees(self, **kwargs) -> pd.DataFrame:
         """Search employees by various criteria"""
-        conn = self.get_connection()
+        conn = self._connection()
         
         conditions = []
         values = []
@@ -520,7 +1880,6 @@ class CompanyDatabase:
         
         if not conditions:
             print("❌ No valid search criteria provided.")
-            conn.close()
             return pd.DataFrame()
         
         try:
@@ -531,8 +1890,6 @@ class CompanyDatabase:
         except sqlite3.Error as e:
             print(f"❌ Error searching employees: {e}")
             return pd.DataFrame()
-        finally:
-            conn.close()
     
     def initialize_sample_data(self):
         """Initialize database with sample data"""
@@ -558,7 +1915,7 @@ class CompanyDatabase:
         Search employees by various criteria and return full employee records
         (Modified version of search_employees that returns full records instead of just emails)
         """
-        conn = self.get_connection()
+        conn = self._connection()
         
         conditions = []
         values = []
@@ -576,7 +1933,6 @@ class CompanyDatabase:
         
         if not conditions:
             print("❌ No valid search criteria provided.")
-            conn.close()
             return pd.DataFrame()
         
         try:
@@ -587,8 +1943,6 @@ class CompanyDatabase:
         except sqlite3.Error as e:
             print(f"❌ Error searching employees: {e}")
             return pd.DataFrame()
-        finally:
-            conn.close()
 
 
 # Example usage and demo
@@ -0,0 +1,120 @@
+import argparse
+import os
+import time
+from typing import Optional
+from dotenv import load_dotenv
+from db import CompanyDatabase
+from Email import EmailAutoReply
+from dispatcher import EmailDispatcher, parse_provider_rates
+from leases import PartitionLease
+
+load_dotenv()
+EMAIL=os.getenv("EMAIL")
+PASSWORD=os.getenv("PASSWORD")
+
+
+class DeliveryWorker:
+    """
+    Drain the outbox table in batches, retrying failed sends with exponential backoff.
+    With a lease, only emails in the worker's leased employee partitions are claimed.
+    """
+    def __init__(self, db: CompanyDatabase, dispatcher: EmailDispatcher, batch_size: int = 100,
+                 max_attempts: int = 5, base_delay: int = 30, max_delay: int = 3600,
+                 lease: Optional[PartitionLease] = None):
+        self.db = db
+        self.dispatcher = dispatcher
+        self.lease = lease
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def retry_delay(self, attempts: int):
+        """Seconds to wait before the next attempt, or None once attempts are exhausted"""
+        if attempts >= self.max_attempts:
+            return None
+        return min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+
+    def run_once(self, policy_id: Optional[int] = None) -> int:
+        """Claim and deliver one batch; returns the number of emails processed"""
+        worker_id = None
+        if self.lease:
+            self.lease.renew()
+            worker_id = self.lease.worker_id
+        batch = self.db.claim_outbox_batch(self.batch_size, policy_id, worker_id=worker_id)
+        if not batch:
+            return 0
+
+        email_list = [
+            {'email': recipient, 'subject': subject, 'body': body}
+            for _, _, _, recipient, subject, body, _ in batch
+        ]
+        results = self.dispatcher.send_all(email_list)
+
+        sent, failures = [], []
+        for row, result in zip(batch, results):
+            outbox_id, attempts = row[0], row[6]
+            if result['success']:
+                sent.append(outbox_id)
+            else:
+                failures.append((outbox_id, result['error'], self.retry_delay(attempts)))
+
+        if sent:
+            self.db.mark_outbox_sent(sent)
+        if failures:
+            self.db.mark_outbox_failed(failures)
+        print(f"📧 Delivered {len(sent)}/{len(batch)} emails ({len(failures)} failed).")
+        return len(batch)
+
+    def drain(self, policy_id: Optional[int] = None) -> int:
+        """Deliver batches until nothing is due; returns the number of emails processed"""
+        processed = 0
+        while True:
+            count = self.run_once(policy_id)
+            if count == 0:
+                return processed
+            processed += count
+
+    def run_forever(self, idle_sleep: float = 2.0, stale_after: int = 600):
+        """Keep draining the outbox, sleeping while it is empty"""
+        self.db.requeue_stale_outbox(stale_after)
+        while True:
+            if self.run_once() == 0:
+                time.sleep(idle_sleep)
+                self.db.requeue_stale_outbox(stale_after)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deliver queued policy emails from the outbox")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("DISPATCH_WORKERS", "4")))
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--once", action="store_true", help="Deliver a single batch and exit")
+    parser.add_argument("--shard", action="store_true",
+                        help="Lease a share of the employee partitions so several workers can run side by side")
+    args = parser.parse_args()
+
+    email_bot = EmailAutoReply(EMAIL, PASSWORD, pool_size=args.workers)
+    dispatcher = EmailDispatcher(email_bot, workers=args.workers,
+                                 rate_per_second=float(os.getenv("DISPATCH_RATE", "0")),
+                                 provider_rates=parse_provider_rates(os.getenv("DISPATCH_PROVIDER_RATES", "")))
+    db = CompanyDatabase()
+    db.migrate()
+    lease = PartitionLease(db, ttl=int(os.getenv("LEASE_TTL", "60"))) if args.shard else None
+    if lease:
+        lease.start()
+    worker = DeliveryWorker(db, dispatcher, batch_size=args.batch_size, lease=lease)
+
+    print("🚀 Starting outbox delivery worker...")
+    try:
+        if args.once:
+            worker.run_once()
+        else:
+            worker.run_forever()
+    finally:
+        if lease:
+            lease.release()
+        email_bot.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+
+def get_provider(email_addr: str) -> str:
+    """Return the mail provider (domain) an address is delivered to"""
+    return email_addr.rsplit('@', 1)[-1].strip().lower()
+
+
+def parse_provider_rates(spec: str) -> Dict[str, float]:
+    """Parse "gmail.com=5,outlook.com=2" into per-domain emails per second"""
+    return {
+        domain.strip().lower(): float(rate)
+        for domain, rate in (item.split('=', 1) for item in spec.split(',') if '=' in item)
+    }
+
+
+class RateLimiter:
+    """Token bucket per provider so one domain is never sent to faster than its limit"""
+    def __init__(self, rate_per_second: float, burst: int = 1, provider_rates: Optional[Dict[str, float]] = None):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.provider_rates = {k.lower(): v for k, v in (provider_rates or {}).items()}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, provider: str):
+        """Block until a send to this provider is allowed"""
+        rate = self.provider_rates.get(provider, self.rate_per_second)
+        if not rate:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(provider, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - last) * rate)
+                if tokens >= 1:
+                    self._buckets[provider] = (tokens - 1, now)
+                    return
+                self._buckets[provider] = (tokens, now)
+                wait = (1 - tokens) / rate
+            time.sleep(wait)
+
+
+class EmailDispatcher:
+    """Send personalized emails across a pool of worker threads"""
+    def __init__(self, email_bot, workers: int = 4, rate_per_second: float = 0,
+                 provider_rates: Optional[Dict[str, float]] = None):
+        self.email_bot = email_bot
+        self.workers = workers
+        self.rate_limiter = RateLimiter(rate_per_second, provider_rates=provider_rates)
+
+    def _send_one(self, email_data: dict) -> dict:
+        """Send one email and capture the outcome instead of raising"""
+        self.rate_limiter.acquire(get_provider(email_data['email']))
+        try:
+            self.email_bot.send_email(email_data['email'], email_data['subject'], email_data['body'])
+            return {'email': email_data['email'], 'success': True, 'error': None}
+        except Exception as e:
+            print(f"Failed to send email to {email_data['email']}: {e}")
+            return {'email': email_data['email'], 'success': False, 'error': str(e)}
+
+    def send_all(self, email_list: List[dict]) -> List[dict]:
+        """
+        Send every {'email', 'subject', 'body'} item and return per-recipient results
+        in the same order as email_list
+        """
+        if not email_list:
+            return []
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="email-dispatch") as executor:
+            return list(executor.map(self._send_one, email_list))
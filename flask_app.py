@@ -1,10 +1,12 @@
-from flask import Flask, request, render_template_string, jsonify
-import base64
-import json
+from flask import Flask, Response, request, jsonify
 import logging
+import os
+import queue
+import threading
 from datetime import datetime
 # Import your database class
 from db import CompanyDatabase
+from tokens import ExpiredToken, InvalidToken, read_token, require_secret
 
 app = Flask(__name__)
 
@@ -12,9 +14,62 @@ app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Links cannot be verified without the signing key, refuse to start rather than 500 every click
+require_secret()
+
 # Initialize database
 db = CompanyDatabase()
 
+
+class AckWriter:
+    """
+    Single writer thread for acknowledgement clicks. Requests queue their update and wait;
+    the writer commits everything that queued up while the previous batch was being
+    written (at most max_batch rows) in one transaction, then wakes each request with its
+    own result. Batching is opportunistic: a lone click is written straight away, and
+    batches only grow when clicks arrive faster than commits finish.
+    """
+    def __init__(self, db: CompanyDatabase, max_batch: int = 500):
+        self.db = db
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="ack-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, policy_id: int, employee_id: int, status: str, timeout: float = 10) -> bool:
+        """Queue one update and block until its batch has committed; returns whether it was recorded"""
+        item = {'update': (policy_id, employee_id, status), 'done': threading.Event(), 'result': False}
+        self._queue.put(item)
+        if not item['done'].wait(timeout):
+            logger.error(f"Timed out waiting for acknowledgement write: policy {policy_id}, employee {employee_id}")
+            return False
+        return item['result']
+
+    def _next_batch(self):
+        """Block for one update, then take whatever else is already queued (up to max_batch)"""
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                results = self.db.update_acknowledgement_statuses([item['update'] for item in batch])
+            except Exception as e:
+                logger.error(f"Acknowledgement batch of {len(batch)} failed: {e}")
+                results = [False] * len(batch)
+            for item, result in zip(batch, results):
+                item['result'] = result
+                item['done'].set()
+
+
+ack_writer = AckWriter(db, max_batch=int(os.getenv("ACK_BATCH_SIZE", "500")))
+
 # HTML templates for response pages
 SUCCESS_TEMPLATE = """
 <!DOCTYPE html>
@@ -76,7 +131,7 @@ SUCCESS_TEMPLATE = """
         <div class="details">
             <strong>Details:</strong><br>
             Policy ID: {{ details.policy_id }}<br>
-            Employee: {{ details.employee_email }}<br>
+            Employee ID: {{ details.employee_id }}<br>
             Status: {{ details.status }}<br>
             Timestamp: {{ details.timestamp }}
         </div>
@@ -88,102 +143,76 @@ SUCCESS_TEMPLATE = """
 </html>
 """
 
-def get_employee_id_by_email(email):
-    """Get employee ID from email address"""
-    try:
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM employee WHERE email = ?", (email,))
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else None
-    except Exception as e:
-        logger.error(f"Error getting employee ID for email {email}: {e}")
-        return None
+# Compiled once; the error pages never change so they are rendered to bytes up front
+RESPONSE_PAGE = app.jinja_env.from_string(SUCCESS_TEMPLATE)
+
+ERROR_PAGE_CONTENT = {
+    'missing_token': ("Error", "Invalid acknowledgement link - missing token.", 400),
+    'invalid_token': ("Error", "Invalid acknowledgement link - corrupted data.", 400),
+    'expired_token': ("Link Expired", "This acknowledgement link has expired. Please contact HR for a new one.", 410),
+    'legacy_link': ("Link No Longer Supported",
+                    "This acknowledgement link uses an old format that is no longer supported. "
+                    "Please use the links in the most recent policy reminder email.", 410),
+    'database_error': ("Database Error", "Failed to record your acknowledgement. Please contact IT support.", 500),
+    'system_error': ("System Error", "An unexpected error occurred. Please contact IT support.", 500),
+    'not_found': ("Page Not Found", "The requested page was not found.", 404),
+    'internal_error': ("Internal Server Error", "An internal server error occurred. Please contact IT support.", 500),
+}
+
+ERROR_PAGES = {
+    name: (RESPONSE_PAGE.render(title=title, message=message, icon="❌", icon_class="error-icon", details=None).encode(),
+           status)
+    for name, (title, message, status) in ERROR_PAGE_CONTENT.items()
+}
+
+def page_response(**context):
+    """Render the response page for a recorded acknowledgement"""
+    return Response(RESPONSE_PAGE.render(**context), mimetype="text/html")
+
+def error_response(name):
+    """Serve one of the pre-rendered error pages"""
+    body, status = ERROR_PAGES[name]
+    return Response(body, status=status, mimetype="text/html")
 
 @app.route('/acknowledge', methods=['GET'])
 def handle_acknowledgement():
     """Handle policy acknowledgement link clicks"""
     try:
-        # Get encoded data from URL parameter
-        encoded_data = request.args.get('data')
+        # Get the signed token from URL parameter
+        token = request.args.get('t')
         
-        if not encoded_data:
-            return render_template_string(SUCCESS_TEMPLATE, 
-                title="Error",
-                message="Invalid acknowledgement link - missing data parameter.",
-                icon="❌",
-                icon_class="error-icon",
-                details=None
-            ), 400
+        if not token:
+            # Emails sent before signed tokens carried a base64 ?data= payload
+            if 'data' in request.args:
+                return error_response('legacy_link')
+            return error_response('missing_token')
         
-        # Decode the data
+        # Verify the signature; the token itself names the policy, employee and response
         try:
-            decoded_data = base64.urlsafe_b64decode(encoded_data.encode()).decode()
-            data = json.loads(decoded_data)
-        except Exception as decode_error:
-            logger.error(f"Failed to decode acknowledgement data: {decode_error}")
-            return render_template_string(SUCCESS_TEMPLATE,
-                title="Error",
-                message="Invalid acknowledgement link - corrupted data.",
-                icon="❌",
-                icon_class="error-icon",
-                details=None
-            ), 400
-        
-        # Extract required fields
-        policy_id = data.get('policy_id')
-        employee_email = data.get('email')
-        status = data.get('status')
-        
-        # Validate required fields
-        if not all([policy_id, employee_email, status]):
-            return render_template_string(SUCCESS_TEMPLATE,
-                title="Error", 
-                message="Invalid acknowledgement link - missing required data.",
-                icon="❌",
-                icon_class="error-icon",
-                details=None
-            ), 400
+            policy_id, employee_id, status = read_token(token)
+        except ExpiredToken:
+            return error_response('expired_token')
+        except InvalidToken as token_error:
+            logger.warning(f"Rejected acknowledgement token: {token_error}")
+            return error_response('invalid_token')
         
-        # Validate status
-        if status not in ['ack', 'nak']:
-            return render_template_string(SUCCESS_TEMPLATE,
-                title="Error",
-                message="Invalid acknowledgement status.",
-                icon="❌", 
-                icon_class="error-icon",
-                details=None
-            ), 400
-        
-        # Get employee ID from email
-        employee_id = get_employee_id_by_email(employee_email)
-        if not employee_id:
-            return render_template_string(SUCCESS_TEMPLATE,
-                title="Error",
-                message="Employee not found in database.",
-                icon="❌",
-                icon_class="error-icon", 
-                details=None
-            ), 404
-        
-        # Update acknowledgement status in database
-        success = db.update_acknowledgement_status(policy_id, employee_id, status)
+        # Record it with the next batched write; the response waits for the commit
+        success = ack_writer.submit(policy_id, employee_id, status)
         
         if success:
             # Log the acknowledgement
-            logger.info(f"Policy {policy_id} acknowledgement updated: {employee_email} -> {status}")
+            logger.info(f"Policy {policy_id} acknowledgement updated: employee {employee_id} -> {status}")
             
             # Prepare response details
             details = {
                 'policy_id': policy_id,
-                'employee_email': employee_email,
+                'employee_id': employee_id,
                 'status': 'Acknowledged' if status == 'ack' else 'Not Acknowledged',
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             }
             
             if status == 'ack':
-                return render_template_string(SUCCESS_TEMPLATE,
+                return page_response(
                     title="Policy Acknowledged Successfully!",
                     message="Thank you for acknowledging this policy. Your response has been recorded.",
                     icon="✅",
@@ -191,7 +220,7 @@ def handle_acknowledgement():
                     details=details
                 )
             else:
-                return render_template_string(SUCCESS_TEMPLATE,
+                return page_response(
                     title="Policy Non-Acknowledgement Recorded",
                     message="Your non-acknowledgement has been recorded. HR will contact you for further discussion.",
                     icon="⚠️",
@@ -199,24 +228,12 @@ def handle_acknowledgement():
                     details=details
                 )
         else:
-            logger.error(f"Failed to update acknowledgement for policy {policy_id}, employee {employee_email}")
-            return render_template_string(SUCCESS_TEMPLATE,
-                title="Database Error",
-                message="Failed to record your acknowledgement. Please contact IT support.",
-                icon="❌",
-                icon_class="error-icon",
-                details=None
-            ), 500
+            logger.error(f"Failed to update acknowledgement for policy {policy_id}, employee {employee_id}")
+            return error_response('database_error')
             
     except Exception as e:
         logger.error(f"Unexpected error in acknowledgement handler: {e}")
-        return render_template_string(SUCCESS_TEMPLATE,
-            title="System Error",
-            message="An unexpected error occurred. Please contact IT support.",
-            icon="❌",
-            icon_class="error-icon",
-            details=None
-        ), 500
+        return error_response('system_error')
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -231,23 +248,8 @@ def health_check():
 def acknowledgement_stats():
     """Get acknowledgement statistics (optional endpoint for monitoring)"""
     try:
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
-        # Get overall stats
-        cursor.execute("""
-            SELECT 
-                status,
-                COUNT(*) as count
-            FROM acknowledgements 
-            GROUP BY status
-        """)
-        
-        stats = {}
-        for row in cursor.fetchall():
-            stats[row[0]] = row[1]
-        
-        conn.close()
+        # Get overall stats from the per-policy counters
+        stats = {status: count for status, count in db.get_acknowledgement_totals().items() if count}
         
         return jsonify({
             'acknowledgement_stats': stats,
@@ -260,23 +262,11 @@ def acknowledgement_stats():
 
 @app.errorhandler(404)
 def not_found(error):
-    return render_template_string(SUCCESS_TEMPLATE,
-        title="Page Not Found",
-        message="The requested page was not found.",
-        icon="❌",
-        icon_class="error-icon",
-        details=None
-    ), 404
+    return error_response('not_found')
 
 @app.errorhandler(500)
 def internal_error(error):
-    return render_template_string(SUCCESS_TEMPLATE,
-        title="Internal Server Error", 
-        message="An internal server error occurred. Please contact IT support.",
-        icon="❌",
-        icon_class="error-icon",
-        details=None
-    ), 500
+    return error_response('internal_error')
 
 if __name__ == '__main__':
     print("🚀 Starting Policy Acknowledgement Service...")
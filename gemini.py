@@ -1,16 +1,19 @@
-import google.generativeai as genai
 from dotenv import load_dotenv
+import hashlib
 import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, wait
+from db import CompanyDatabase
 load_dotenv()
 KEY=os.getenv("GEMINI_KEY")
-class gemini_class:
-    def __init__(self):
-        self.api_key=KEY
-        genai.configure(api_key=self.api_key)
+MODEL_NAME="models/gemini-2.0-flash"
+# Bump whenever the prompt below changes so cached emails from the old prompt are not reused
+PROMPT_VERSION=1
 
-    def process_policy(self, policy):
-    
-        prompt = f"""
+def build_prompt(policy):
+    return f"""
         You are a workplace communication assistant.
 
         Your task is to write a **formal and professional email** to employees about a new internal policy. 
@@ -33,10 +36,152 @@ class gemini_class:
 
         Now, generate the email:
         """
-            
-        model = genai.GenerativeModel(model_name="models/gemini-2.0-flash")
-        response = model.generate_content(prompt)
+
+class LLMBackend(ABC):
+    """Text generation backend used by gemini_class"""
+    model_name = None
+
+    @abstractmethod
+    def generate(self, prompt, timeout=None):
+        """Return the model's text for a prompt"""
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini via google.generativeai"""
+    def __init__(self, api_key=None, model_name=MODEL_NAME):
+        # Imported here so the stub backend works without the SDK installed
+        import google.generativeai as genai
+        genai.configure(api_key=api_key or KEY)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name=model_name)
+
+    def generate(self, prompt, timeout=None):
+        request_options = {"timeout": timeout} if timeout else None
+        response = self.model.generate_content(prompt, request_options=request_options)
+        return response.text
+
+class StubBackend(LLMBackend):
+    """Deterministic template-based backend for offline runs and load testing"""
+    model_name = "stub"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def generate(self, prompt, timeout=None):
+        if self.latency:
+            time.sleep(self.latency)
+        # Pull the policy text back out of the prompt built by build_prompt
+        policy = prompt.split("The content of the policy is:", 1)[-1].split("✅ Do:", 1)[0].strip().strip('"')
+        return (
+            "Subject: New Policy Notice\n\n"
+            "Dear Employees,\n\n"
+            f"Please note the following policy, effective immediately: {policy}\n\n"
+            "Best Regards,\n"
+            "Compliance Department"
+        )
+
+def get_backend(name=None):
+    """Build the backend named by `name` or the LLM_BACKEND env var ('gemini' or 'stub')"""
+    name = (name or os.getenv("LLM_BACKEND", "gemini")).lower()
+    if name == "stub":
+        return StubBackend(latency=float(os.getenv("LLM_STUB_LATENCY", "0")))
+    if name == "gemini":
+        return GeminiBackend()
+    raise ValueError(f"Unknown LLM backend: {name}")
+
+class PolicyEmailCache:
+    """Cache of generated policy emails in the llm_cache table, with TTL expiry and LRU eviction"""
+    def __init__(self, db=None, ttl_seconds=30 * 24 * 3600, max_entries=1000):
+        self.db = db if db is not None else CompanyDatabase()
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.db.migrate()
+
+    @staticmethod
+    def make_key(model, policy):
+        """Content address for a (prompt version, model, policy text) triple"""
+        material = f"{PROMPT_VERSION}\0{model}\0{policy}".encode("utf-8")
+        return hashlib.sha256(material).hexdigest()
+
+    def get(self, key):
+        """Return the cached response, or None if missing or expired"""
+        now = time.time()
+        try:
+            with self.db.transaction() as conn:
+                row = conn.execute("SELECT response FROM llm_cache WHERE key = ? AND created_at >= ?",
+                                   (key, now - self.ttl_seconds)).fetchone()
+                if row:
+                    conn.execute("UPDATE llm_cache SET last_used_at = ? WHERE key = ?", (now, key))
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            print(f"❌ Error reading LLM cache: {e}")
+            return None
+
+    def put(self, key, model, response):
+        """Store a response, then drop expired and least recently used entries"""
+        now = time.time()
+        try:
+            with self.db.transaction() as conn:
+                conn.execute("INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, last_used_at) VALUES (?, ?, ?, ?, ?)",
+                             (key, model, response, now, now))
+                conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+                conn.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+                """, (self.max_entries,))
+        except sqlite3.Error as e:
+            print(f"❌ Error writing LLM cache: {e}")
+
+class gemini_class:
+    def __init__(self, cache=None, backend=None):
+        self.backend = backend if backend is not None else get_backend()
+        self.model_name = self.backend.model_name
+        self.cache = cache if cache is not None else PolicyEmailCache()
+
+    def process_policy(self, policy, timeout=None):
+    
+        key = self.cache.make_key(self.model_name, policy)
+        cached = self.cache.get(key)
+        if cached is not None:
+            print("Using cached policy email")
+            return cached
+
+        prompt = build_prompt(policy)
+        text = self.backend.generate(prompt, timeout=timeout)
         
         # Step 5: Output result
-        print(response.text)
-        return response.text
+        print(text)
+        self.cache.put(key, self.model_name, text)
+        return text
+
+    def process_policies_batch(self, policies, max_workers=4, timeout=60):
+        """
+        Generate emails for many policy texts concurrently.
+        Returns one {'policy', 'output', 'error'} dict per input, in input order;
+        a failure or timeout on one policy does not affect the others.
+        """
+        # Identical texts share one generation
+        unique_policies = list(dict.fromkeys(policies))
+        results = {}
+
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini-batch")
+        try:
+            futures = {executor.submit(self.process_policy, policy, timeout): policy for policy in unique_policies}
+            # Allow for queueing behind max_workers, plus a second of slack per wave
+            waves = -(-len(futures) // max_workers) if futures else 0
+            done, not_done = wait(futures, timeout=waves * (timeout + 1))
+
+            for future in done:
+                policy = futures[future]
+                try:
+                    results[policy] = {'policy': policy, 'output': future.result(), 'error': None}
+                except Exception as e:
+                    results[policy] = {'policy': policy, 'output': None, 'error': str(e) or type(e).__name__}
+            for future in not_done:
+                future.cancel()
+                policy = futures[future]
+                results[policy] = {'policy': policy, 'output': None, 'error': f"Timed out after {timeout}s"}
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return [results[policy] for policy in policies]
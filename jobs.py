@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+from db import CompanyDatabase
+
+
+class JobRunner:
+    """Run policy rollouts on background threads and record their progress in the jobs table"""
+    def __init__(self, db: CompanyDatabase, max_workers: int = 4):
+        self.db = db
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="policy-job")
+        # Jobs from a previous process can never finish, don't leave them looking active
+        self.db.fail_interrupted_jobs()
+
+    def _run(self, job_id: int, fn: Callable, args: tuple):
+        self.db.update_job(job_id, status='running')
+        try:
+            fn(job_id, *args)
+            self.db.update_job(job_id, status='completed', stage='done')
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {e}")
+            self.db.update_job(job_id, status='failed', message=str(e) or type(e).__name__)
+
+    def submit(self, policy_id: int, fn: Callable, *args) -> Optional[int]:
+        """
+        Queue fn(job_id, *args) for a policy and return the job ID immediately.
+        fn reports progress through db.update_job; raising marks the job failed.
+        """
+        job_id = self.db.create_job(policy_id)
+        if job_id is None:
+            return None
+        self.executor.submit(self._run, job_id, fn, args)
+        return job_id
+
+    def _run_batch(self, job_ids: List[int], fn: Callable, args: tuple):
+        for job_id in job_ids:
+            self.db.update_job(job_id, status='running')
+        try:
+            fn(job_ids, *args)
+        except Exception as e:
+            print(f"❌ Jobs {job_ids} failed: {e}")
+            for job_id in job_ids:
+                self.db.update_job(job_id, status='failed', message=str(e) or type(e).__name__)
+            return
+
+        # fn marks individual jobs failed itself, everything else is done
+        for job_id in job_ids:
+            job = self.db.get_job_status(job_id)
+            if job and job['status'] == 'running':
+                self.db.update_job(job_id, status='completed', stage='done')
+
+    def submit_batch(self, policy_ids: List[int], fn: Callable, *args) -> List[int]:
+        """
+        Create one job per policy and queue fn(job_ids, *args) to handle them together.
+        Returns the job IDs (in policy_ids order) immediately.
+        """
+        job_ids = [self.db.create_job(policy_id) for policy_id in policy_ids]
+        if None in job_ids:
+            # Nothing will run them, don't leave the ones that were created looking queued
+            for job_id in job_ids:
+                if job_id is not None:
+                    self.db.update_job(job_id, status='failed', message='Could not create every job in the batch')
+            return []
+        self.executor.submit(self._run_batch, job_ids, fn, args)
+        return job_ids
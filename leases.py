@@ -0,0 +1,69 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import List, Optional
+from db import CompanyDatabase, LEASE_PARTITIONS
+
+
+def default_worker_id() -> str:
+    """Unique per process, readable in the worker_leases table"""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class PartitionLease:
+    """
+    A worker's share of the employee partitions, held as expiring lease rows.
+    Workers that stop renewing (crash, hang) lose their partitions to the others once
+    the lease expires; new workers get a share as existing ones rebalance on renewal.
+    """
+    def __init__(self, db: CompanyDatabase, worker_id: Optional[str] = None, ttl: int = 60):
+        self.db = db
+        self.worker_id = worker_id or default_worker_id()
+        self.ttl = ttl
+        self.partitions: List[int] = []
+        # Bumped whenever the held partitions change, so callers can tell they were rebalanced
+        self.generation = 0
+        self._renewed_at = 0.0
+        self._heartbeat = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """
+        Renew every ttl/3 seconds on a background thread, so the lease (and the worker's
+        claims) stay alive while a long batch of sends blocks the work loop
+        """
+        self.renew(force=True)
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._beat, name="lease-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def _beat(self):
+        while not self._stop.wait(self.ttl / 3):
+            self.renew(force=True)
+
+    def renew(self, force: bool = False) -> List[int]:
+        """Renew and rebalance leases, at most every ttl/3 seconds unless forced; returns the held partitions"""
+        now = time.monotonic()
+        if force or now - self._renewed_at >= self.ttl / 3:
+            held = self.db.acquire_partitions(self.worker_id, self.ttl)
+            if held != self.partitions:
+                print(f"🔑 Worker {self.worker_id} holds {len(held)}/{LEASE_PARTITIONS} partitions.")
+                self.generation += 1
+            self.partitions = held
+            self._renewed_at = now
+        return self.partitions
+
+    def owns(self, employee_id: int) -> bool:
+        """Whether work for this employee belongs to this worker as of the last renewal"""
+        return int(employee_id) % LEASE_PARTITIONS in self.partitions
+
+    def release(self):
+        """Hand every partition back so other workers can take over straight away"""
+        self._stop.set()
+        if self._heartbeat:
+            self._heartbeat.join()
+            self._heartbeat = None
+        self.db.release_partitions(self.worker_id)
+        self.partitions = []
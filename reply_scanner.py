@@ -0,0 +1,126 @@
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional
+from dotenv import load_dotenv
+from db import CompanyDatabase
+from Email import EmailAutoReply
+
+load_dotenv()
+EMAIL=os.getenv("EMAIL")
+PASSWORD=os.getenv("PASSWORD")
+
+
+def reply_matcher(subject_keywords: Iterable[str], senders: Optional[Iterable[str]] = None) -> Callable[[dict], bool]:
+    """Match replies whose subject contains any keyword, optionally only from the given senders"""
+    keywords = [keyword.lower() for keyword in subject_keywords if keyword]
+    allowed = {sender.lower() for sender in senders} if senders is not None else None
+
+    def match(header: dict) -> bool:
+        if allowed is not None and header['from'] not in allowed:
+            return False
+        subject = header['subject'].lower()
+        return any(keyword in subject for keyword in keywords)
+    return match
+
+
+class ReplyScanner:
+    """
+    Incrementally read replies from an IMAP mailbox. The last seen UID (and the mailbox's
+    UIDVALIDITY) is kept in the imap_sync_state table, so each poll fetches headers of new
+    messages only and downloads bodies just for those the matcher accepts. If UIDVALIDITY
+    changes the saved position is meaningless and the scan restarts from `lookback_days` ago.
+    """
+    def __init__(self, db: CompanyDatabase, email_bot: EmailAutoReply, mailbox: str = 'INBOX',
+                 lookback_days: int = 7, batch_size: int = 200):
+        self.db = db
+        self.email_bot = email_bot
+        self.mailbox = mailbox
+        self.lookback_days = lookback_days
+        self.batch_size = batch_size
+
+    def _new_uid_sets(self, uid_validity: int) -> tuple:
+        """UID sets to fetch headers for, and the last UID already processed"""
+        state = self.db.get_mailbox_state(self.mailbox)
+        if state and state[0] == uid_validity:
+            return [f"{state[1] + 1}:*"], state[1]
+
+        if state:
+            print(f"⚠️ UIDVALIDITY of {self.mailbox} changed, rescanning the last {self.lookback_days} days.")
+        since = (datetime.now() - timedelta(days=self.lookback_days)).strftime("%d-%b-%Y")
+        _, messages = self.email_bot.imap.uid('search', None, f'(SINCE "{since}")')
+        uids = messages[0].split() if messages and messages[0] else []
+        return [b','.join(uids[i:i + self.batch_size]).decode()
+                for i in range(0, len(uids), self.batch_size)], 0
+
+    def poll(self, matcher: Callable[[dict], bool]) -> List[dict]:
+        """
+        Fetch what arrived since the last poll and return the matching replies as dicts with
+        uid, from, subject, in_reply_to and body, oldest first.
+        """
+        uid_validity, uid_next = self.email_bot.select_mailbox(self.mailbox)
+        uid_sets, last_uid = self._new_uid_sets(uid_validity)
+
+        replies = []
+        for uid_set in uid_sets:
+            # "n:*" always returns the newest message, even when its UID is below n
+            headers = [header for header in self.email_bot.fetch_reply_headers(uid_set)
+                       if header['uid'] > last_uid]
+            if not headers:
+                continue
+            matches = [header for header in headers if matcher(header)]
+            bodies = self.email_bot.fetch_reply_bodies([header['uid'] for header in matches])
+            for header in matches:
+                replies.append({**header, 'body': bodies.get(header['uid'])})
+            last_uid = headers[-1]['uid']
+
+        # Everything below UIDNEXT has been looked at (or is older than the lookback window),
+        # so a quiet first scan still moves the position past the existing mail
+        last_uid = max(last_uid, uid_next - 1)
+        self.db.save_mailbox_state(self.mailbox, uid_validity, last_uid)
+        return replies
+
+    def run_forever(self, matcher: Callable[[dict], bool], handler: Callable[[dict], None],
+                    interval: float = 60):
+        """Poll every `interval` seconds, passing each matching reply to the handler"""
+        while True:
+            for reply in self.poll(matcher):
+                handler(reply)
+            time.sleep(interval)
+
+
+def print_reply(reply: dict):
+    print(f"📨 Reply {reply['uid']} from {reply['from']}: {reply['subject']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll the compliance inbox for replies to policy emails")
+    parser.add_argument("--mailbox", default=os.getenv("REPLY_MAILBOX", "INBOX"))
+    parser.add_argument("--keywords", default=os.getenv("REPLY_KEYWORDS", "policy,acknowledg"),
+                        help="Comma separated subject keywords that identify a reply")
+    parser.add_argument("--lookback-days", type=int, default=7,
+                        help="How far back to scan on first run or after UIDVALIDITY changes")
+    parser.add_argument("--interval", type=float, default=60, help="Seconds between polls")
+    parser.add_argument("--once", action="store_true", help="Poll once and exit")
+    args = parser.parse_args()
+
+    db = CompanyDatabase()
+    db.migrate()
+    email_bot = EmailAutoReply(EMAIL, PASSWORD)
+    scanner = ReplyScanner(db, email_bot, mailbox=args.mailbox, lookback_days=args.lookback_days)
+    matcher = reply_matcher(args.keywords.split(','))
+
+    print("📬 Starting reply scanner...")
+    try:
+        if args.once:
+            for reply in scanner.poll(matcher):
+                print_reply(reply)
+        else:
+            scanner.run_forever(matcher, print_reply, interval=args.interval)
+    finally:
+        email_bot.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import re
+import os
+from gemini import PolicyEmailCache, gemini_class
+from tokens import make_token
+
+def parse_email(text):
+    # Extract subject
+    subject_match = re.search(r"Subject:\s*(.*)", text)
+    subject = subject_match.group(1).strip() if subject_match else None
+
+    # Extract body (everything after subject line)
+    parts = re.split(r"Subject:.*?\n\s*\n", text, maxsplit=1)
+    body = parts[1].strip() if len(parts) > 1 else None
+
+    print("Subject:", subject)
+    print("\nBody:\n", body)
+
+    return subject, body
+
+def generate_acknowledgement_links(policy_id, employee_id, base_url="http://localhost:5000"):
+    """
+    Generate acknowledgement and non-acknowledgement links for email.
+    Each link carries a signed token naming the policy, employee and response.
+    """
+    ack_link = f"{base_url}/acknowledge?t={make_token(policy_id, employee_id, 'ack')}"
+    nak_link = f"{base_url}/acknowledge?t={make_token(policy_id, employee_id, 'nak')}"
+    
+    return ack_link, nak_link
+
+def create_email_body_with_links(original_body, policy_id, employee_id):
+    """
+    Modify the email body to include acknowledgement links
+    """
+    ack_link, nak_link = generate_acknowledgement_links(policy_id, employee_id)
+    
+    # Add acknowledgement section to email body
+    acknowledgement_section = f"""
+
+    ---
+
+    POLICY ACKNOWLEDGEMENT REQUIRED:
+
+    Please click one of the following links to acknowledge this policy:
+
+    ✅ I ACKNOWLEDGE and will comply with this policy:
+    {ack_link}
+
+    ❌ I DO NOT ACKNOWLEDGE this policy (requires discussion):
+    {nak_link}
+
+    Important: You must click one of these links to complete your policy acknowledgement.
+
+    ---
+    """
+    
+    # Append to original body
+    modified_body = original_body + acknowledgement_section
+    return modified_body
+
+def create_reminder_digest_body(employee_name, employee_id, policies):
+    """
+    One reminder email listing every (policy_id, policy_text) the employee still
+    has to respond to, each with its own acknowledgement links
+    """
+    sections = []
+    for number, (policy_id, policy_text) in enumerate(policies, start=1):
+        ack_link, nak_link = generate_acknowledgement_links(policy_id, employee_id)
+        sections.append(f"""
+    {number}. Policy #{policy_id}: {policy_text}
+
+    ✅ I ACKNOWLEDGE and will comply with this policy:
+    {ack_link}
+
+    ❌ I DO NOT ACKNOWLEDGE this policy (requires discussion):
+    {nak_link}
+""")
+    
+    return f"""Dear {employee_name},
+
+    You have {len(policies)} {'policy' if len(policies) == 1 else 'policies'} still awaiting your acknowledgement.
+    Please click one of the links under each policy to record your response.
+{''.join(sections)}
+    ---
+
+    Best Regards
+    Compliance Department
+    """
+
+class PolicyRollout:
+    """Generate, queue and deliver a policy's emails, reporting progress on its job"""
+    def __init__(self, db, delivery_worker, llm_factory=None):
+        self.db = db
+        self.delivery_worker = delivery_worker
+        if llm_factory is None:
+            # One cache on the rollout's database instead of a fresh connection per generator
+            cache = PolicyEmailCache(db)
+            llm_factory = lambda: gemini_class(cache=cache)
+        self.llm_factory = llm_factory
+
+    def run(self, job_id, policy, gemini_output=None):
+        """
+        Job body for a policy rollout: generate the email (unless already generated),
+        queue one copy per recipient in the outbox and deliver them, reporting each
+        stage through the jobs table
+        """
+        self.db.update_job(job_id, stage="Finding recipients")
+        # We need both email and employee ID for acknowledgement links
+        employees_df = self.db.search_employees_full(department=policy['department'], work_mode=policy['work_mode'])
+        
+        if employees_df.empty:
+            raise ValueError("No recipients found for this policy")
+        
+        self.db.update_job(job_id, total=len(employees_df))
+        
+        # Process with Gemini AI
+        if gemini_output is None:
+            self.db.update_job(job_id, stage="Processing with AI")
+            g = self.llm_factory()
+            gemini_output = g.process_policy(policy['text'])
+        
+        # Parse email content
+        subject, body = parse_email(text=gemini_output)
+        
+        # Queue personalized emails with acknowledgement links
+        outbox_rows = []
+        for _, employee in employees_df.iterrows():
+            # Create personalized email body with acknowledgement links
+            personalized_body = create_email_body_with_links(
+                original_body=body,
+                policy_id=policy['id'],
+                employee_id=employee['id']
+            )
+            
+            outbox_rows.append((int(policy['id']), int(employee['id']), employee['email'], subject, personalized_body))
+        
+        self.db.enqueue_outbox(outbox_rows)
+        
+        # Mark policy as implemented
+        if not self.db.update_policy(policy['id'], status="Implemented"):
+            raise RuntimeError("Failed to update policy status in database")
+        
+        # Deliver now; anything left for retry is picked up by delivery_worker.py
+        self.db.update_job(job_id, stage="Sending emails")
+        self.delivery_worker.drain(policy_id=int(policy['id']))
+    
+    def run_bulk(self, job_ids, policies):
+        """Job body for rolling out many policies: generate all emails concurrently, then roll out each"""
+        for job_id in job_ids:
+            self.db.update_job(job_id, stage="Processing with AI")
+        
+        g = self.llm_factory()
+        results = g.process_policies_batch([policy['text'] for policy in policies],
+                                           max_workers=int(os.getenv("LLM_BATCH_WORKERS", "4")))
+        
+        for job_id, policy, result in zip(job_ids, policies, results):
+            if result['error']:
+                self.db.update_job(job_id, status='failed', message=result['error'])
+                continue
+            try:
+                self.run(job_id, policy, gemini_output=result['output'])
+            except Exception as e:
+                self.db.update_job(job_id, status='failed', message=str(e) or type(e).__name__)
@@ -1,62 +1,306 @@
-import streamlit as st
-import pandas as pd
-from datetime import datetime
-import re
-import time
-import sqlite3
-from db import CompanyDatabase  
-from gemini import gemini_class  
-from Email import EmailAutoReply
-import base64
+import argparse
+import calendar
+import heapq
 import json
-from urllib.parse import urlencode
-from dotenv import load_dotenv
 import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+from dotenv import load_dotenv
+from db import CompanyDatabase
 from Email import EmailAutoReply
+from dispatcher import EmailDispatcher, parse_provider_rates
+from leases import PartitionLease
+from rollout import create_email_body_with_links, create_reminder_digest_body
+from tokens import require_secret
+
 load_dotenv()
 EMAIL=os.getenv("EMAIL")
 PASSWORD=os.getenv("PASSWORD")
-db = CompanyDatabase()
-
-# Get email instance
-email_bot = EmailAutoReply(EMAIL, PASSWORD)
-
-
-conn = db.get_connection()
-cursor = conn.cursor()
-
-# Query to get acknowledgement status for this specific policy
-query = """
-SELECT 
-    e.id as employee_id,
-    e.name as employee_name,
-    e.email as employee_email,
-    e.department,
-    e.work_mode,
-    a.status,
-    a.updated_at,
-    a.created_at
-FROM acknowledgements a
-JOIN employee e ON a.employee_id = e.id
-ORDER BY e.name
-"""
-
-cursor.execute(query)
-acknowledgement_data = cursor.fetchall()
-conn.close()
-
-if acknowledgement_data:    
-    # Convert data to DataFrame for easier handling
-    columns = ['employee_id', 'employee_name', 'employee_email', 'department', 'work_mode', 'status', 'updated_at', 'created_at']
-    status_df = pd.DataFrame(acknowledgement_data, columns=columns)
-
-    subject="Policy Acknowledgement Reminder"
-    message="It is requested to please acknowledge the previously shared email regarding new policy implementation \n Best Regards \n Compliance Department"
-
-    # Create custom table with status indicators
-    for idx, row in status_df.iterrows():
-        if(row['status']=="not responded"):
-            print(row['employee_email'])
-            email_bot.send_with_followup(row['employee_email'],subject,message," ")
-            
-            
+
+REMINDER_SUBJECT = "Policy Acknowledgement Reminder"
+# Followed by freshly signed links, so reminders still work after the original email's links expire
+REMINDER_MESSAGE = "It is requested to please acknowledge the previously shared email regarding new policy implementation using one of the links below \n Best Regards \n Compliance Department"
+
+
+def parse_reminder_days(spec: Optional[str], default: Optional[List[int]] = None) -> List[int]:
+    """Parse a cadence such as "3,7,14" (days after rollout); empty falls back to the default"""
+    days = sorted({int(day) for day in (spec or "").split(',') if day.strip()})
+    return days or list(default or [])
+
+
+def parse_timestamp(value: str) -> float:
+    """SQLite CURRENT_TIMESTAMP text (UTC) to epoch seconds"""
+    return calendar.timegm(datetime.strptime(value, "%Y-%m-%d %H:%M:%S").timetuple())
+
+
+class ReminderScheduler:
+    """
+    Send acknowledgement reminders on each policy's cadence. Due times live in the
+    reminders table; in memory there is one heap entry per policy (its earliest due
+    reminder), so the loop sleeps until something is due instead of rescanning history.
+    In digest mode employees get one email covering all their outstanding policies and
+    the heap holds a single entry for the earliest due reminder of any policy.
+    With a lease, only employees in the worker's leased partitions are reminded. Due reminders
+    are claimed just before sending, so a partition changing hands mid-batch cannot double-send.
+    """
+    def __init__(self, db: CompanyDatabase, dispatcher: EmailDispatcher, default_days: List[int],
+                 batch_size: int = 100, refresh_interval: float = 300, retry_delay: int = 3600,
+                 digest: bool = False, lease: Optional[PartitionLease] = None, claim_timeout: int = 900):
+        self.db = db
+        self.dispatcher = dispatcher
+        self.default_days = default_days
+        self.digest = digest
+        self.lease = lease
+        self.batch_size = batch_size
+        self.refresh_interval = refresh_interval
+        self.retry_delay = retry_delay
+        # How long a claimed reminder stays reserved for this worker while it is being sent
+        self.claim_timeout = claim_timeout
+        self._heap = []
+        self._cadences = {}
+        self._next_refresh = 0.0
+        self._stop = threading.Event()
+        # Implemented policies already given reminders, the last acknowledgement id looked at and
+        # the lease generation both were built under
+        self._scheduled_policies = set()
+        self._scheduled_through = 0
+        self._scheduled_generation = None
+
+    @property
+    def worker_id(self) -> Optional[str]:
+        return self.lease.worker_id if self.lease else None
+
+    def _owned(self, rows: list, employee_index: int) -> list:
+        """Renew the lease and drop rows whose employee partition this worker no longer holds"""
+        if not self.lease:
+            return rows
+        self.lease.renew()
+        return [row for row in rows if self.lease.owns(row[employee_index])]
+
+    def _claim(self, rows: list, id_index: int) -> list:
+        """Claim the reminders about to be sent and drop the ones another worker got to first"""
+        claimed = set(self.db.claim_reminders([row[id_index] for row in rows], self.worker_id, self.claim_timeout))
+        return [row for row in rows if row[id_index] in claimed]
+
+    def _rebalanced(self) -> bool:
+        """Whether the leased partitions changed since reminders were last scheduled"""
+        return self.lease is not None and self.lease.generation != self._scheduled_generation
+
+    def _schedule_new(self):
+        """
+        Start reminders for newly implemented policies, and for acknowledgements created since the
+        last refresh (new hires, transfers, backfills) on policies already scheduled. With a lease
+        only the worker's partitions are scheduled, and a rebalance starts over with a full pass.
+        """
+        generation = self.lease.generation if self.lease else None
+        if self._rebalanced():
+            self._scheduled_policies = set()
+            self._scheduled_through = 0
+        # Read the high-water mark first so acknowledgements added meanwhile are picked up next time
+        last_id = self.db.get_last_acknowledgement_id()
+        scheduled = set()
+        for policy_id, reminder_days in self.db.get_implemented_policies():
+            days = parse_reminder_days(reminder_days, self.default_days)
+            if not days:
+                continue
+            if policy_id not in self._scheduled_policies:
+                self.db.schedule_reminders(policy_id, days[0], worker_id=self.worker_id)
+            elif last_id > self._scheduled_through:
+                self.db.schedule_reminders(policy_id, days[0], after_id=self._scheduled_through,
+                                           worker_id=self.worker_id)
+            scheduled.add(policy_id)
+        self._scheduled_policies = scheduled
+        self._scheduled_through = last_id
+        self._scheduled_generation = generation
+
+    def refresh(self):
+        """Start reminders for new rollouts and newly enrolled employees, then rebuild the heap from the database"""
+        if self.lease:
+            self.lease.renew()
+        self._schedule_new()
+
+        self._heap = []
+        self._cadences = {}
+        if self.digest:
+            next_due_at = self.db.get_next_digest_due(self.worker_id)
+            if next_due_at:
+                self._heap.append((parse_timestamp(next_due_at), None))
+        else:
+            for policy_id, next_due_at, reminder_days in self.db.get_reminder_queue(self.worker_id):
+                self._cadences[policy_id] = parse_reminder_days(reminder_days, self.default_days)
+                self._heap.append((parse_timestamp(next_due_at), policy_id))
+        heapq.heapify(self._heap)
+        self._next_refresh = time.time() + self.refresh_interval
+
+    def _next_reminder_day(self, reminders_sent: int, days: List[int]) -> Optional[int]:
+        # reminders_sent + 1 reminders have now gone out; the next is days[reminders_sent + 1]
+        return days[reminders_sent + 1] if reminders_sent + 1 < len(days) else None
+
+    def _record(self, sent: list, failures: list):
+        if sent:
+            self.db.advance_reminders(sent)
+        if failures:
+            self.db.retry_reminders(failures)
+
+    def process_policy(self, policy_id: int) -> Optional[float]:
+        """Send every reminder due for a policy; returns when its next one is due"""
+        days = self._cadences.get(policy_id, self.default_days)
+        for due in self.db.iter_due_reminders(policy_id, self.batch_size, self.worker_id):
+            due = self._claim(self._owned(due, 1), 0)
+            if not due:
+                continue
+            results = self.dispatcher.send_all([
+                {'email': email, 'subject': REMINDER_SUBJECT,
+                 'body': create_email_body_with_links(REMINDER_MESSAGE, policy_id, employee_id)}
+                for _, employee_id, email, _, _ in due
+            ])
+
+            sent, failures = [], []
+            for (acknowledgement_id, _, _, _, reminders_sent), result in zip(due, results):
+                if result['success']:
+                    sent.append((acknowledgement_id, self._next_reminder_day(reminders_sent, days)))
+                else:
+                    failures.append((acknowledgement_id, result['error'], self.retry_delay))
+
+            self._record(sent, failures)
+            print(f"📧 Policy {policy_id}: sent {len(sent)}/{len(due)} reminders ({len(failures)} failed).")
+
+        next_due_at = self.db.get_next_reminder_due(policy_id, self.worker_id)
+        return parse_timestamp(next_due_at) if next_due_at else None
+
+    def process_digests(self) -> Optional[float]:
+        """
+        Send one digest to every employee with a reminder due, listing all their outstanding
+        policies. Only the reminders that were due move on in their cadence; the rest are
+        mentioned early but keep their schedule. Returns when the next one is due.
+        """
+        for due in self.db.iter_due_reminder_digests(self.batch_size, self.worker_id):
+            due = self._owned(due, 0)
+            digests = [(employee_id, email, name, json.loads(reminders)) for employee_id, email, name, reminders in due]
+            # Only send digests whose due reminders this worker managed to claim
+            claimed = set(self.db.claim_reminders(
+                [r['acknowledgement_id'] for *_, reminders in digests for r in reminders if r['due']],
+                self.worker_id, self.claim_timeout))
+            for *_, reminders in digests:
+                for reminder in reminders:
+                    reminder['due'] = reminder['acknowledgement_id'] in claimed
+            digests = [digest for digest in digests if any(r['due'] for r in digest[3])]
+            if not digests:
+                continue
+            results = self.dispatcher.send_all([
+                {
+                    'email': email,
+                    'subject': f"Reminder: {len(reminders)} {'policy' if len(reminders) == 1 else 'policies'} awaiting your acknowledgement",
+                    'body': create_reminder_digest_body(
+                        name, employee_id, [(r['policy_id'], r['policy_text']) for r in reminders])
+                }
+                for employee_id, email, name, reminders in digests
+            ])
+
+            sent, failures = [], []
+            for (_, _, _, reminders), result in zip(digests, results):
+                for reminder in reminders:
+                    if not reminder['due']:
+                        continue
+                    if result['success']:
+                        days = parse_reminder_days(reminder['reminder_days'], self.default_days)
+                        sent.append((reminder['acknowledgement_id'],
+                                     self._next_reminder_day(reminder['reminders_sent'], days)))
+                    else:
+                        failures.append((reminder['acknowledgement_id'], result['error'], self.retry_delay))
+
+            self._record(sent, failures)
+            delivered = sum(result['success'] for result in results)
+            print(f"📧 Sent {delivered}/{len(digests)} reminder digests covering {len(sent)} due policy reminders.")
+
+        next_due_at = self.db.get_next_digest_due(self.worker_id)
+        return parse_timestamp(next_due_at) if next_due_at else None
+
+    def _process(self, policy_id: Optional[int]) -> Optional[float]:
+        return self.process_digests() if policy_id is None else self.process_policy(policy_id)
+
+    def run_once(self) -> int:
+        """Send everything due right now; returns the number of heap entries processed"""
+        self.refresh()
+        processed = 0
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, policy_id = heapq.heappop(self._heap)
+            self._process(policy_id)
+            processed += 1
+        return processed
+
+    def run_forever(self):
+        """Sleep until the earliest reminder is due (or the next refresh), send it, repeat"""
+        self.refresh()
+        while not self._stop.is_set():
+            now = time.time()
+            if self._heap and self._heap[0][0] <= now:
+                _, policy_id = heapq.heappop(self._heap)
+                next_due = self._process(policy_id)
+                if next_due is not None:
+                    heapq.heappush(self._heap, (next_due, policy_id))
+                continue
+
+            if now >= self._next_refresh or self._rebalanced():
+                # Picks up rollouts and responses recorded by other processes, and partitions
+                # taken over from other workers
+                self.refresh()
+                continue
+
+            wake_at = min(self._heap[0][0], self._next_refresh) if self._heap else self._next_refresh
+            if self.lease:
+                # The heartbeat rebalances every ttl/3 seconds; look for a change as often
+                wake_at = min(wake_at, now + self.lease.ttl / 3)
+            self._stop.wait(wake_at - now)
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send policy acknowledgement reminders on a per-policy cadence")
+    parser.add_argument("--once", action="store_true", help="Send whatever is due now and exit")
+    parser.add_argument("--days", default=os.getenv("REMINDER_DAYS", "3,7,14"),
+                        help="Default cadence in days after rollout, for policies without their own")
+    parser.add_argument("--digest", action="store_true", default=os.getenv("REMINDER_DIGEST") == "1",
+                        help="Send each employee one email covering all their outstanding policies")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--refresh-interval", type=float, default=300,
+                        help="Seconds between rescans for new rollouts and responses")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("DISPATCH_WORKERS", "4")))
+    parser.add_argument("--shard", action="store_true",
+                        help="Lease a share of the employee partitions so several schedulers can run side by side")
+    args = parser.parse_args()
+
+    # Reminders carry freshly signed links
+    require_secret()
+    db = CompanyDatabase()
+    db.migrate()
+    email_bot = EmailAutoReply(EMAIL, PASSWORD, pool_size=int(os.getenv("SMTP_POOL_SIZE", "4")))
+    dispatcher = EmailDispatcher(email_bot, workers=args.workers,
+                                 rate_per_second=float(os.getenv("DISPATCH_RATE", "0")),
+                                 provider_rates=parse_provider_rates(os.getenv("DISPATCH_PROVIDER_RATES", "")))
+    lease = PartitionLease(db, ttl=int(os.getenv("LEASE_TTL", "60"))) if args.shard else None
+    if lease:
+        lease.start()
+    scheduler = ReminderScheduler(db, dispatcher, parse_reminder_days(args.days),
+                                  batch_size=args.batch_size, refresh_interval=args.refresh_interval,
+                                  digest=args.digest, lease=lease)
+
+    print("⏰ Starting reminder scheduler...")
+    try:
+        if args.once:
+            scheduler.run_once()
+        else:
+            scheduler.run_forever()
+    finally:
+        if lease:
+            lease.release()
+        email_bot.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import base64
+import hashlib
+import hmac
+import os
+import struct
+import time
+from typing import Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+# ACK_SECRET (required): HMAC key that signs acknowledgement links. Every process that sends
+# or verifies links (dashboard, scheduler, Flask service) must share it; changing it
+# invalidates links already sent. ACK_TOKEN_TTL_DAYS: how long a link stays valid.
+ACK_SECRET = os.getenv("ACK_SECRET")
+ACK_TOKEN_TTL = int(os.getenv("ACK_TOKEN_TTL_DAYS", "30")) * 86400
+
+STATUS_CODES = {'ack': 1, 'nak': 2}
+STATUS_NAMES = {code: status for status, code in STATUS_CODES.items()}
+
+# policy_id, employee_id, status code, expiry (unix seconds), followed by a truncated HMAC-SHA256
+PAYLOAD = struct.Struct(">IIBI")
+SIGNATURE_SIZE = 12
+TOKEN_SIZE = PAYLOAD.size + SIGNATURE_SIZE
+
+
+class InvalidToken(ValueError):
+    """The token is malformed, forged or expired"""
+
+
+class ExpiredToken(InvalidToken):
+    """The token was genuine but its link is past its expiry"""
+
+
+def require_secret():
+    """Fail at startup, rather than inside the first rollout job, when ACK_SECRET is missing"""
+    _secret(None)
+
+
+def _secret(secret: Optional[str]) -> bytes:
+    secret = secret or ACK_SECRET
+    if not secret:
+        raise RuntimeError("ACK_SECRET is not set; acknowledgement links cannot be signed or verified")
+    return secret.encode()
+
+
+def _sign(payload: bytes, secret: Optional[str]) -> bytes:
+    return hmac.new(_secret(secret), payload, hashlib.sha256).digest()[:SIGNATURE_SIZE]
+
+
+def make_token(policy_id: int, employee_id: int, status: str, expires_at: Optional[int] = None,
+               secret: Optional[str] = None) -> str:
+    """Sign an acknowledgement as a 34 character URL-safe token"""
+    if expires_at is None:
+        expires_at = int(time.time()) + ACK_TOKEN_TTL
+    payload = PAYLOAD.pack(int(policy_id), int(employee_id), STATUS_CODES[status], int(expires_at))
+    return base64.urlsafe_b64encode(payload + _sign(payload, secret)).decode().rstrip("=")
+
+
+def read_token(token: str, secret: Optional[str] = None, now: Optional[float] = None) -> Tuple[int, int, str]:
+    """Verify a token and return (policy_id, employee_id, status); raises InvalidToken"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (ValueError, TypeError):
+        raise InvalidToken("Token is not valid base64")
+    if len(raw) != TOKEN_SIZE:
+        raise InvalidToken("Token has the wrong length")
+
+    payload, signature = raw[:PAYLOAD.size], raw[PAYLOAD.size:]
+    if not hmac.compare_digest(signature, _sign(payload, secret)):
+        raise InvalidToken("Token signature does not match")
+
+    policy_id, employee_id, status_code, expires_at = PAYLOAD.unpack(payload)
+    if status_code not in STATUS_NAMES:
+        raise InvalidToken("Token has an unknown status")
+    if expires_at < (time.time() if now is None else now):
+        raise ExpiredToken("Token has expired")
+    return policy_id, employee_id, STATUS_NAMES[status_code]